@@ -6,11 +6,25 @@ import os
 import sys
 from pathlib import Path
 
-# Ajouter src au path
-sys.path.insert(0, str(Path(__file__).parent))
 
-from dotenv import load_dotenv
-load_dotenv()
+def _setup_env():
+    """Prepare l'execution d'une commande (path + .env), apres le parsing."""
+    # Ajouter src au path
+    sys.path.insert(0, str(Path(__file__).parent))
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
+def _scan_notes(vault: str, db: str) -> list[dict]:
+    """Scanne le vault en reutilisant le cache de scan stocke dans la base."""
+    from src.note_parser import scan_vault, load_scan_cache, save_scan_cache
+
+    cache_path = str(Path(db) / "scan_cache.json")
+    cache = load_scan_cache(cache_path)
+    notes = list(scan_vault(vault, cache=cache))
+    save_scan_cache(cache, cache_path)
+    return notes
 
 
 def cmd_index(args):
@@ -55,19 +69,21 @@ def cmd_status(args):
     print(f"\nGraphe de liens:")
     for key, value in stats['graph'].items():
         print(f"  {key}: {value}")
+    if stats['central_notes']:
+        print(f"\nNotes centrales (PageRank):")
+        for note, score in stats['central_notes']:
+            print(f"  {note} ({score:.4f})")
 
 
 def cmd_list(args):
     """Liste les notes indexees."""
-    from src.note_parser import scan_vault
-
-    notes = scan_vault(args.vault)
+    notes = _scan_notes(args.vault, args.db)
 
     if args.tags:
-        tag_filter = [t.strip().lower() for t in args.tags.split(',')]
+        tag_filter = {t.strip().lower() for t in args.tags.split(',')}
         notes = [
             n for n in notes
-            if any(t.lower() in [x.lower() for x in n['tags']] for t in tag_filter)
+            if not tag_filter.isdisjoint(x.lower() for x in n['tags'])
         ]
 
     print(f"\n{len(notes)} notes trouvees:\n")
@@ -115,11 +131,10 @@ def cmd_search(args):
 
 def cmd_rebuild_links(args):
     """Reconstruit le graphe de liens."""
-    from src.note_parser import scan_vault
     from src.wikilink_graph import WikilinkGraph
 
     print(f"Scan du vault: {args.vault}")
-    notes = scan_vault(args.vault)
+    notes = _scan_notes(args.vault, args.db)
 
     print(f"Reconstruction du graphe ({len(notes)} notes)...")
     graph = WikilinkGraph()
@@ -143,8 +158,8 @@ def main():
     # Arguments globaux
     parser.add_argument(
         "--vault", "-v",
-        default=os.getenv("OBSIDIAN_VAULT", ""),
-        help="Chemin vers le vault Obsidian"
+        default="",
+        help="Chemin vers le vault Obsidian (defaut: OBSIDIAN_VAULT)"
     )
     parser.add_argument(
         "--db", "-d",
@@ -182,6 +197,11 @@ def main():
 
     args = parser.parse_args()
 
+    # --help et les erreurs d'arguments sortent avant de charger quoi que ce soit
+    _setup_env()
+    if not args.vault:
+        args.vault = os.getenv("OBSIDIAN_VAULT", "")
+
     if not args.vault:
         print("Erreur: Vault non specifie. Utilisez --vault ou OBSIDIAN_VAULT")
         sys.exit(1)
@@ -4,29 +4,48 @@ Gere l'indexation incrementale des notes dans ChromaDB.
 """
 
 import os
-import gc
+import heapq
 import logging
-import hashlib
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
 
 import chromadb
 from chromadb.config import Settings
+import blake3
+import numpy as np
+import orjson
 import voyageai
 
-from .note_parser import parse_note, scan_vault
+from .note_parser import HASH_VERSION, iter_vault_files, parse_notes
 from .wikilink_graph import WikilinkGraph
 
 logger = logging.getLogger(__name__)
 
+# Limites par requete de l'API Voyage AI (128 textes, ~120k tokens)
+EMBED_MAX_BATCH = 128
+EMBED_MAX_TOKENS = 110_000
+# Reessais (backoff exponentiel du client voyageai) sur 429 / 503
+EMBED_MAX_RETRIES = 5
+# Requetes d'embedding simultanees pendant l'indexation
+EMBED_MAX_WORKERS = 8
+# Taille des pages lors de la lecture des metadonnees ChromaDB
+METADATA_PAGE_SIZE = 5000
+
+
+def note_doc_id(path: str) -> str:
+    """ID ChromaDB d'une note, base sur le chemin (pas le hash pour eviter les doublons)."""
+    return f"note_{blake3.blake3(path.encode()).hexdigest()[:12]}"
+
 
 class ObsidianIndexer:
     """
     Indexeur de notes Obsidian avec support incremental.
 
     Features:
-    - Indexation complete ou incrementale (MD5 hash)
+    - Indexation complete ou incrementale (hash BLAKE3)
     - Embeddings via Voyage AI
     - Graphe de wikilinks
     """
@@ -36,7 +55,8 @@ class ObsidianIndexer:
         vault_path: str,
         db_path: str = "./chroma_db",
         collection_name: str = "obsidian_notes",
-        voyage_api_key: Optional[str] = None
+        voyage_api_key: Optional[str] = None,
+        parse_processes: bool = True
     ):
         """
         Args:
@@ -44,16 +64,19 @@ class ObsidianIndexer:
             db_path: Chemin vers la base ChromaDB
             collection_name: Nom de la collection
             voyage_api_key: Cle API Voyage (ou env VOYAGE_API_KEY)
+            parse_processes: False pour parser avec des threads seulement
+                (voir parse_notes), ex: depuis le serveur MCP
         """
         self.vault_path = Path(vault_path)
         self.db_path = Path(db_path)
         self.collection_name = collection_name
+        self.parse_processes = parse_processes
 
         # Voyage AI client
         api_key = voyage_api_key or os.getenv("VOYAGE_API_KEY")
         if not api_key:
             raise ValueError("VOYAGE_API_KEY requis")
-        self.voyage = voyageai.Client(api_key=api_key)
+        self.voyage = voyageai.Client(api_key=api_key, max_retries=EMBED_MAX_RETRIES)
 
         # ChromaDB
         self.db_path.mkdir(parents=True, exist_ok=True)
@@ -69,20 +92,33 @@ class ObsidianIndexer:
         # Graphe de liens
         self.graph = WikilinkGraph()
         self.graph_path = self.db_path / "wikilink_graph.json"
+        self._graph_loaded = False
         if self.graph_path.exists():
-            self.graph.load(str(self.graph_path))
+            self._graph_loaded = self.graph.load(str(self.graph_path))
 
-    def embed_texts(self, texts: list[str], model: str = "voyage-3") -> list[list[float]]:
+    def embed_texts(self, texts: list[str], model: str = "voyage-3") -> np.ndarray:
         """
         Genere des embeddings via Voyage AI.
 
         Pour les notes Obsidian (documents entiers), utilise voyage-3 standard.
         voyage-context-3 necessite du chunking et n'est pas adapte aux documents entiers.
+
+        Les textes sont regroupes en requetes d'au plus EMBED_MAX_BATCH textes
+        et EMBED_MAX_TOKENS tokens; les embeddings sont retournes dans l'ordre,
+        sous forme de matrice float32 (une ligne par texte).
         """
         if not texts:
-            return []
+            return np.empty((0, 0), dtype=np.float32)
+
+        processed_texts = self._prepare_texts(texts)
+
+        return np.concatenate([
+            self._embed_batch(processed_texts[start:end], model)
+            for start, end in self._token_batches(processed_texts, model)
+        ])
 
-        # Filtrer les textes vides et tronquer les textes trop longs
+    def _prepare_texts(self, texts: list[str]) -> list[str]:
+        """Remplace les textes vides et tronque les textes trop longs."""
         processed_texts = []
         for text in texts:
             if not text or not text.strip():
@@ -93,59 +129,140 @@ class ObsidianIndexer:
                 processed_texts.append(text[:32000])
             else:
                 processed_texts.append(text)
+        return processed_texts
 
+    def _embed_batch(self, texts: list[str], model: str = "voyage-3") -> np.ndarray:
+        """Une requete Voyage AI pour un batch deja prepare et decoupe."""
         result = self.voyage.embed(
-            texts=processed_texts,
+            texts=texts,
             model=model,
             input_type="document"
         )
-        return result.embeddings
+        # float32 contigu: 4 octets par dimension au lieu d'un float Python
+        return np.asarray(result.embeddings, dtype=np.float32)
+
+    def _token_batches(self, texts: list[str], model: str) -> list[tuple[int, int]]:
+        """
+        Decoupe une liste de textes en tranches contigues (debut, fin)
+        respectant les limites de l'API Voyage (remplissage glouton).
+        """
+        try:
+            counts = [len(encoding) for encoding in self.voyage.tokenize(texts, model)]
+        except Exception:
+            # Tokenizer indisponible (ex: hors ligne) - estimation prudente
+            counts = [len(text) // 3 + 1 for text in texts]
+
+        batches = []
+        start = 0
+        tokens = 0
+        for i, count in enumerate(counts):
+            if i > start and (i - start >= EMBED_MAX_BATCH or tokens + count > EMBED_MAX_TOKENS):
+                batches.append((start, i))
+                start, tokens = i, 0
+            tokens += count
+        if start < len(counts):
+            batches.append((start, len(counts)))
+        return batches
 
     def _force_persist(self):
         """
-        Force la persistance ChromaDB en recreant le client.
+        Force la persistance ChromaDB via un checkpoint WAL SQLite.
 
         ChromaDB utilise SQLite avec WAL. Les donnees sont ecrites dans le WAL
         mais pas immediatement checkpoint vers le fichier principal. Un autre
         processus peut ne pas voir les donnees non-checkpoint.
 
-        Cette methode force le checkpoint en fermant et recreant le client.
+        Le checkpoint est fait directement sur le fichier SQLite: le client
+        et l'index HNSW restent ouverts en memoire.
+        """
+        sqlite_path = self.db_path / "chroma.sqlite3"
+        if not sqlite_path.exists():
+            return
+
+        try:
+            conn = sqlite3.connect(str(sqlite_path))
+            try:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+            finally:
+                conn.close()
+            logger.info("ChromaDB persiste (checkpoint WAL force)")
+        except sqlite3.Error as e:
+            logger.warning(f"Impossible de forcer le checkpoint WAL: {e}")
+
+    def get_indexed_metadata(self) -> dict[str, dict]:
         """
-        collection_name = self.collection_name
-        db_path = self.db_path
+        Recupere les metadonnees des notes deja indexees.
 
-        # Supprimer les references pour forcer la fermeture
-        del self.collection
-        del self.chroma
-        gc.collect()
+        Returns:
+            dict chemin -> metadonnees (avec l'ID ChromaDB sous la cle 'id')
+        """
+        return self._load_index_state()[0]
 
-        # Recreer le client (force le checkpoint WAL)
-        self.chroma = chromadb.PersistentClient(
-            path=str(db_path),
-            settings=Settings(anonymized_telemetry=False)
-        )
-        self.collection = self.chroma.get_or_create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine"}
-        )
-        logger.info("ChromaDB persiste (checkpoint WAL force)")
+    def _load_index_state(self) -> tuple[dict[str, dict], list[str]]:
+        """
+        Lit l'etat de la collection.
+
+        Returns:
+            tuple: (metadonnees par chemin pour les IDs canoniques,
+                    IDs non canoniques a purger: anciens IDs MD5, IDs poses
+                    par l'auto-indexation du serveur, doublons)
+        """
+        entries = {}
+        legacy_ids = []
+        offset = 0
+
+        # Lecture paginee pour borner la memoire sur les grosses collections
+        while True:
+            try:
+                result = self.collection.get(
+                    include=["metadatas"],
+                    limit=METADATA_PAGE_SIZE,
+                    offset=offset
+                )
+            except Exception:
+                return {}, []
+
+            for doc_id, meta in zip(result['ids'], result['metadatas'] or []):
+                if not meta or 'path' not in meta:
+                    continue
+                if doc_id != note_doc_id(meta['path']):
+                    legacy_ids.append(doc_id)
+                    continue
+                entries[meta['path']] = dict(meta, id=doc_id)
+
+            if len(result['ids']) < METADATA_PAGE_SIZE:
+                break
+            offset += METADATA_PAGE_SIZE
+
+        return entries, legacy_ids
 
     def get_indexed_hashes(self) -> dict[str, str]:
-        """Recupere les hashes des notes deja indexees."""
-        try:
-            result = self.collection.get(include=["metadatas"])
-            hashes = {}
-            for i, meta in enumerate(result['metadatas'] or []):
-                if meta and 'path' in meta and 'hash' in meta:
-                    hashes[meta['path']] = meta['hash']
-            return hashes
-        except Exception:
-            return {}
+        """
+        Recupere les hashes des notes deja indexees.
+
+        Les entrees indexees avec une autre version de hash (ex: MD5) recoivent
+        un hash vide pour etre reindexees une fois.
+        """
+        return {
+            path: self._stored_hash(meta)
+            for path, meta in self.get_indexed_metadata().items()
+        }
+
+    @staticmethod
+    def _stored_hash(meta: dict) -> str:
+        """Hash stocke, ou '' s'il provient d'une autre version de hash."""
+        if meta.get('hash_version') != HASH_VERSION:
+            return ''
+        return meta.get('hash', '')
 
     def index_vault(self, incremental: bool = True) -> dict:
         """
         Indexe le vault Obsidian.
 
+        En mode incremental, une note dont (mtime_ns, taille) n'a pas change
+        n'est ni lue ni hashee. Le hash BLAKE3 du contenu n'est calcule que
+        lorsque le stat differe de celui stocke dans ChromaDB.
+
         Args:
             incremental: Si True, n'indexe que les notes modifiees
 
@@ -161,60 +278,118 @@ class ObsidianIndexer:
             'started_at': datetime.now().isoformat()
         }
 
-        # Scanner le vault
-        logger.info(f"Scan du vault: {self.vault_path}")
-        notes = scan_vault(
-            str(self.vault_path),
-            exclude_folders=['.obsidian', '.trash', '.git']
-        )
-        stats['total_notes'] = len(notes)
-        logger.info(f"Trouve {len(notes)} notes")
-
-        # Hashes existants (toujours recuperer pour detecter les suppressions)
-        existing_hashes = self.get_indexed_hashes()
+        # Metadonnees existantes (toujours recuperer pour detecter les suppressions)
+        existing, legacy_ids = self._load_index_state()
+        existing_hashes = {
+            path: self._stored_hash(meta) for path, meta in existing.items()
+        }
 
-        # Chemins actuels pour detecter les suppressions
-        current_paths = {note['path'] for note in notes}
+        # Purger les IDs non canoniques: upsert ne les remplacerait pas
+        if legacy_ids:
+            try:
+                self.collection.delete(ids=legacy_ids)
+                logger.info(f"Purge de {len(legacy_ids)} anciens documents")
+            except Exception as e:
+                logger.warning(f"Erreur purge anciens documents: {e}")
 
-        # Detecter les notes supprimees (documents orphelins dans ChromaDB)
-        for path in list(existing_hashes.keys()):
-            if path not in current_paths:
-                try:
-                    # Trouver l'ID du document
-                    result = self.collection.get(
-                        where={"path": path},
-                        include=[]
-                    )
-                    if result['ids']:
-                        self.collection.delete(ids=result['ids'])
-                        stats['deleted'] += 1
-                        logger.info(f"Supprime: {path}")
-                except Exception as e:
-                    logger.warning(f"Erreur suppression {path}: {e}")
+        # Le graphe est mis a jour de facon incrementale s'il a ete charge;
+        # sinon il est reconstruit et toutes les notes sont necessaires.
+        rebuild_graph = not incremental or not self._graph_loaded
 
-        # Indexer les notes nouvelles/modifiees
+        # Notes pour la reconstruction du graphe (parsees, ou depuis les metadonnees)
+        notes = []
         notes_to_index = []
-        for note in notes:
-            path = note['path']
-            current_hash = note['hash']
+        touched_ids = []
+        touched_metas = []
 
-            if incremental and path in existing_hashes:
-                if existing_hashes[path] == current_hash:
-                    stats['skipped'] += 1
-                    continue
+        # Parcours du vault en un seul passage (stat seulement, sans lecture).
+        # Fast path: stat inchange -> ni lecture ni hash
+        logger.info(f"Scan du vault: {self.vault_path}")
+        seen_paths = set()
+        to_parse = []
+        for path, mtime_ns, size in iter_vault_files(
+            str(self.vault_path),
+            exclude_folders=['.obsidian', '.trash', '.git']
+        ):
+            seen_paths.add(path)
+            meta = existing.get(path)
+            unchanged = (incremental and existing_hashes.get(path)
+                         and (meta.get('mtime_ns'), meta.get('size')) == (mtime_ns, size))
+            # Metadonnees sans liens exploitables (ancien format): relire la note
+            graph_note = self._note_from_metadata(meta) if unchanged and rebuild_graph else None
+            if unchanged and (graph_note is not None or not rebuild_graph):
+                stats['skipped'] += 1
+                stats['total_notes'] += 1
+                if graph_note is not None:
+                    notes.append(graph_note)
+            else:
+                to_parse.append((path, mtime_ns, size))
+        logger.info(f"Trouve {len(seen_paths)} notes")
+
+        # Parser (en parallele si nombreuses) les notes dont le stat a change
+        for (path, _, _), note in zip(to_parse, parse_notes(to_parse, self.parse_processes)):
+            if not note:
+                continue
+            note['vault_path'] = os.path.relpath(path, self.vault_path)
+            stats['total_notes'] += 1
+
+            if incremental and existing_hashes.get(path) == note['hash']:
+                # Contenu identique (fichier touche): rafraichir le stat seulement
+                stats['skipped'] += 1
+                touched_ids.append(existing[path]['id'])
+                touched_metas.append({
+                    'mtime_ns': note['mtime_ns'],
+                    'size': note['size'],
+                    'wikilinks_json': orjson.dumps(note['wikilinks']).decode()
+                })
+                if rebuild_graph:
+                    notes.append({
+                        'vault_path': note['vault_path'],
+                        'title': note['title'],
+                        'wikilinks': note['wikilinks']
+                    })
+                continue
 
+            if rebuild_graph:
+                notes.append(note)
             notes_to_index.append(note)
 
+        # Detecter les notes supprimees (documents orphelins dans ChromaDB)
+        missing_paths = [path for path in existing if path not in seen_paths]
+        if missing_paths:
+            try:
+                # IDs deterministes: suppression directe, sans requete prealable
+                self.collection.delete(ids=[note_doc_id(path) for path in missing_paths])
+                stats['deleted'] += len(missing_paths)
+                logger.info(f"Supprime: {len(missing_paths)} notes")
+            except Exception as e:
+                logger.warning(f"Erreur suppression: {e}")
+
+        if touched_ids:
+            try:
+                self.collection.update(ids=touched_ids, metadatas=touched_metas)
+            except Exception as e:
+                logger.warning(f"Erreur mise a jour des stats: {e}")
+
         if not notes_to_index:
             logger.info("Aucune note a indexer")
         else:
             logger.info(f"Indexation de {len(notes_to_index)} notes...")
             self._index_notes(notes_to_index, stats)
 
-        # Reconstruire le graphe de liens
-        logger.info("Reconstruction du graphe de liens...")
-        self.graph.rebuild_from_notes(notes)
+        # Graphe de liens: seules les notes modifiees/supprimees sont touchees
+        if rebuild_graph:
+            logger.info("Reconstruction du graphe de liens...")
+            self.graph.rebuild_from_notes(notes)
+        else:
+            logger.info("Mise a jour incrementale du graphe de liens...")
+            removed_paths = [
+                existing[path].get('vault_path') or os.path.relpath(path, self.vault_path)
+                for path in missing_paths
+            ]
+            self.graph.update_notes(notes_to_index, removed_paths)
         self.graph.save(str(self.graph_path))
+        self._graph_loaded = True
 
         # Verification post-indexation
         db_count = self.collection.count()
@@ -233,81 +408,123 @@ class ObsidianIndexer:
         return stats
 
     def _index_notes(self, notes: list[dict], stats: dict):
-        """Indexe une liste de notes."""
-        batch_size = 10
+        """
+        Indexe une liste de notes.
 
-        for i in range(0, len(notes), batch_size):
-            batch = notes[i:i + batch_size]
+        Les batches d'embedding sont envoyes en parallele a Voyage AI
+        (requetes HTTP, limitees par le reseau). Chaque batch est ecrit dans
+        ChromaDB depuis le thread appelant des que ses embeddings arrivent.
 
-            try:
-                # Preparer les textes pour embedding
-                texts = [note['content'] for note in batch]
-
-                # Generer les embeddings
-                embeddings = self.embed_texts(texts)
-
-                # Preparer les metadonnees
-                ids = []
-                documents = []
-                metadatas = []
-
-                for j, note in enumerate(batch):
-                    # ID unique base sur le chemin (pas le hash pour eviter les doublons)
-                    path_hash = hashlib.md5(note['path'].encode()).hexdigest()[:12]
-                    doc_id = f"note_{path_hash}"
-                    ids.append(doc_id)
-                    documents.append(note['content'])
-
-                    # Metadonnees
-                    meta = {
-                        'path': note['path'],
-                        'vault_path': note.get('vault_path', ''),
-                        'title': note['title'],
-                        'tags': ','.join(note['tags']),
-                        'wikilinks': ','.join(note['wikilinks']),
-                        'hash': note['hash'],
-                        'modified': note['modified'],
-                        'indexed_at': datetime.now().isoformat()
-                    }
-                    metadatas.append(meta)
-
-                # Supprimer les anciennes versions
-                for note in batch:
-                    try:
-                        result = self.collection.get(
-                            where={"path": note['path']},
-                            include=[]
-                        )
-                        if result['ids']:
-                            self.collection.delete(ids=result['ids'])
-                    except Exception:
-                        pass
-
-                # Ajouter les nouvelles versions
-                self.collection.add(
-                    ids=ids,
-                    embeddings=embeddings,
-                    documents=documents,
-                    metadatas=metadatas
-                )
+        Le contenu des notes est retire des dicts a l'ecriture (seuls titre,
+        liens et chemins servent ensuite au graphe): la memoire d'un batch est
+        liberee des qu'il est ecrit.
+        """
+        texts = self._prepare_texts([note['content'] for note in notes])
+        batches = self._token_batches(texts, "voyage-3")
 
-                stats['indexed'] += len(batch)
-                logger.info(f"Indexe {stats['indexed']}/{len(notes)} notes")
+        with ThreadPoolExecutor(max_workers=EMBED_MAX_WORKERS) as executor:
+            futures = {
+                executor.submit(self._embed_batch, texts[start:end]): (start, end)
+                for start, end in batches
+            }
 
-            except Exception as e:
-                logger.error(f"Erreur batch {i}: {e}")
-                stats['errors'] += len(batch)
+            for future in as_completed(futures):
+                start, end = futures[future]
+                batch = notes[start:end]
+
+                try:
+                    embeddings = future.result()
+
+                    # Preparer les metadonnees
+                    ids = []
+                    documents = []
+                    metadatas = []
+                    now_iso = datetime.now().isoformat()
+
+                    for note in batch:
+                        ids.append(note_doc_id(note['path']))
+                        documents.append(note.pop('content'))
+                        note.pop('raw_content', None)
+
+                        # Metadonnees
+                        meta = {
+                            'path': note['path'],
+                            'vault_path': note.get('vault_path', ''),
+                            'title': note['title'],
+                            'tags': ','.join(note['tags']),
+                            # JSON: une cible de lien peut contenir des virgules
+                            'wikilinks_json': orjson.dumps(note['wikilinks']).decode(),
+                            'hash': note['hash'],
+                            'hash_version': HASH_VERSION,
+                            'modified': note['modified'],
+                            'mtime_ns': note['mtime_ns'],
+                            'size': note['size'],
+                            'indexed_at': now_iso
+                        }
+                        metadatas.append(meta)
+
+                    # Remplacer les anciennes versions (IDs deterministes)
+                    self.collection.upsert(
+                        ids=ids,
+                        embeddings=embeddings,
+                        documents=documents,
+                        metadatas=metadatas
+                    )
+                    del documents, embeddings
+                    texts[start:end] = [None] * (end - start)
+
+                    stats['indexed'] += len(batch)
+                    logger.info(f"Indexe {stats['indexed']}/{len(notes)} notes")
 
-    def get_stats(self) -> dict:
-        """Retourne les statistiques de la base."""
+                except Exception as e:
+                    logger.error(f"Erreur batch {start}: {e}")
+                    stats['errors'] += len(batch)
+
+    @staticmethod
+    def _note_from_metadata(meta: dict) -> Optional[dict]:
+        """
+        Reconstruit les champs utiles au graphe depuis les metadonnees ChromaDB.
+
+        Returns:
+            None si les liens ne sont pas stockes en JSON (ancienne indexation,
+            liens separes par des virgules): la note doit etre relue
+        """
+        wikilinks = meta.get('wikilinks_json')
+        if wikilinks is None:
+            return None
+        return {
+            'path': meta['path'],
+            'vault_path': meta.get('vault_path', ''),
+            'title': meta.get('title', ''),
+            'wikilinks': orjson.loads(wikilinks)
+        }
+
+    def get_stats(self, central_notes: int = 5) -> dict:
+        """
+        Retourne les statistiques de la base.
+
+        Args:
+            central_notes: Nombre de notes les plus centrales (PageRank du
+                graphe de liens) a inclure
+        """
         count = self.collection.count()
         graph_stats = self.graph.stats()
 
+        # PageRank seulement si demande; top-N sans trier tout le graphe
+        central = []
+        if central_notes > 0:
+            central = heapq.nsmallest(
+                central_notes,
+                self.graph.pagerank().items(),
+                key=lambda item: (-item[1], item[0])
+            )
+
         return {
             'collection': self.collection_name,
             'vault_path': str(self.vault_path),
             'indexed_notes': count,
-            'graph': graph_stats
+            'graph': graph_stats,
+            'central_notes': central
         }
 
     def clear(self):
@@ -318,6 +535,7 @@ class ObsidianIndexer:
             metadata={"hnsw:space": "cosine"}
         )
         self.graph = WikilinkGraph()
+        self._graph_loaded = False
         if self.graph_path.exists():
             self.graph_path.unlink()
         logger.info("Base videe")
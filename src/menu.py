@@ -11,21 +11,30 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from dotenv import load_dotenv
 load_dotenv()
 
-from rich.console import Console
-from rich.panel import Panel
-from rich.prompt import Prompt, IntPrompt
-from rich.table import Table
-from rich.progress import Progress, SpinnerColumn, TextColumn
-
-console = Console()
+# Rich est importe dans les fonctions: charger le module reste instantane.
+# La console est creee par main().
+console = None
 
 # Configuration par defaut
 VAULT_PATH = os.getenv("OBSIDIAN_VAULT", "")
 DB_PATH = "./chroma_db"
 
 
+def _scan_notes() -> list[dict]:
+    """Scanne le vault en reutilisant le cache de scan stocke dans la base."""
+    from src.note_parser import scan_vault, load_scan_cache, save_scan_cache
+
+    cache_path = str(Path(DB_PATH) / "scan_cache.json")
+    cache = load_scan_cache(cache_path)
+    notes = list(scan_vault(VAULT_PATH, cache=cache))
+    save_scan_cache(cache, cache_path)
+    return notes
+
+
 def show_header():
     """Affiche l'en-tete."""
+    from rich.panel import Panel
+
     console.print(Panel.fit(
         "[bold cyan]obsidian-mcp[/bold cyan]\n"
         "[dim]Serveur MCP pour vault Obsidian avec recherche semantique[/dim]",
@@ -36,6 +45,9 @@ def show_header():
 
 def show_menu():
     """Affiche le menu principal."""
+    from rich.panel import Panel
+    from rich.table import Table
+
     table = Table(show_header=False, box=None, padding=(0, 2))
     table.add_column("Option", style="cyan bold")
     table.add_column("Description")
@@ -61,6 +73,8 @@ def menu_index(full: bool = False):
         console.print("[red]Vault non configure. Utilisez l'option 'c' pour configurer.[/red]")
         return
 
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    from rich.table import Table
     from src.indexer import ObsidianIndexer
 
     with Progress(
@@ -107,6 +121,7 @@ def menu_status():
         console.print("[red]Vault non configure.[/red]")
         return
 
+    from rich.table import Table
     from src.indexer import ObsidianIndexer
 
     try:
@@ -128,6 +143,11 @@ def menu_status():
             for key, value in stats['graph'].items():
                 console.print(f"  {key}: {value}")
 
+        if stats['central_notes']:
+            console.print("\n[bold]Notes centrales (PageRank):[/bold]")
+            for note, score in stats['central_notes']:
+                console.print(f"  {note} [dim]({score:.4f})[/dim]")
+
     except Exception as e:
         console.print(f"[red]Erreur: {e}[/red]")
 
@@ -140,7 +160,7 @@ def menu_rebuild_links():
         console.print("[red]Vault non configure.[/red]")
         return
 
-    from src.note_parser import scan_vault
+    from rich.progress import Progress, SpinnerColumn, TextColumn
     from src.wikilink_graph import WikilinkGraph
 
     with Progress(
@@ -150,7 +170,7 @@ def menu_rebuild_links():
     ) as progress:
         task = progress.add_task("Scan du vault...", total=None)
 
-        notes = scan_vault(VAULT_PATH)
+        notes = _scan_notes()
         progress.update(task, description=f"Reconstruction ({len(notes)} notes)...")
 
         graph = WikilinkGraph()
@@ -179,6 +199,9 @@ def menu_search():
     import chromadb
     from chromadb.config import Settings
     import voyageai
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    from rich.prompt import Prompt
+    from rich.table import Table
     from src.retriever import ObsidianRetriever
 
     query = Prompt.ask("Requete de recherche")
@@ -244,9 +267,9 @@ def menu_list():
         console.print("[red]Vault non configure.[/red]")
         return
 
-    from src.note_parser import scan_vault
+    from rich.table import Table
 
-    notes = scan_vault(VAULT_PATH)
+    notes = _scan_notes()
 
     table = Table(title=f"{len(notes)} notes dans le vault")
     table.add_column("Titre", style="cyan")
@@ -270,6 +293,8 @@ def menu_configure():
     """Configure le vault."""
     global VAULT_PATH, DB_PATH
 
+    from rich.prompt import Prompt
+
     console.print(f"\n[bold]Configuration actuelle:[/bold]")
     console.print(f"  Vault: {VAULT_PATH or '[non configure]'}")
     console.print(f"  Base: {DB_PATH}")
@@ -284,8 +309,12 @@ def menu_configure():
 
 def main():
     """Boucle principale du menu."""
-    global VAULT_PATH
+    global VAULT_PATH, console
+
+    from rich.console import Console
+    from rich.prompt import Prompt
 
+    console = Console()
     show_header()
 
     # Charger config depuis settings.yaml si disponible
@@ -293,7 +322,7 @@ def main():
     if config_path.exists():
         import yaml
         with open(config_path, 'r') as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
             if not VAULT_PATH and config.get('vault', {}).get('path'):
                 VAULT_PATH = config['vault']['path']
 
@@ -1,12 +1,74 @@
 """Parser pour notes Obsidian - extraction frontmatter, wikilinks, tags."""
 
+import mmap
+import multiprocessing
 import os
 import re
-import hashlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, Optional
+
+import blake3
+import orjson
 import yaml
 
+# Version du hash de contenu (stockee dans les metadonnees ChromaDB).
+# Une valeur differente force la reindexation des notes concernees.
+HASH_VERSION = "blake3"
+
+# En dessous de ce nombre de notes, le cout de demarrage des processus
+# depasse le gain du parsing parallele.
+PARALLEL_PARSE_MIN_NOTES = 200
+
+# Au-dessus de cette taille, les notes sont lues via mmap (en dessous, les
+# appels systeme supplementaires coutent plus que la copie evitee).
+MMAP_MIN_SIZE = 64 * 1024
+
+# Le delimiteur de fin du frontmatter n'est cherche que dans ce debut de note:
+# une note qui commence par '---' sans frontmatter n'est pas parcourue en entier.
+FRONTMATTER_MAX_SIZE = 64 * 1024
+
+# Champs d'une note gardes dans le cache de scan_vault: assez pour lister,
+# filtrer par tags et reconstruire le graphe, sans contenu ni frontmatter.
+SCAN_CACHE_FIELDS = ('path', 'title', 'tags', 'wikilinks', 'mtime_ns', 'size')
+
+# Loader YAML en C (libyaml) si PyYAML a ete compile avec, sinon pur Python
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# Expressions compilees une seule fois pour toutes les notes
+_FRONTMATTER_END_RE = re.compile(r'\n---\s*\n')
+_WIKILINK_RE = re.compile(r'\[\[([^\]|]+)(?:\|[^\]]+)?\]\]')
+# Pattern: #tag mais pas ##header ni #[[link]]. Le '#' litteral vient en
+# premier (le moteur saute aux candidats), le caractere precedent est verifie
+# ensuite par une assertion sur deux caracteres.
+_TAG_RE = re.compile(r'#(?<![#\w]#)([a-zA-Z][a-zA-Z0-9_/-]*)')
+_H1_RE = re.compile(r'^#\s+(.+)$', re.MULTILINE)
+
+# Les trois en une seule passe sur le corps (parse_note). Pour le H1, seul le
+# prefixe est reconnu: le reste de la ligne peut contenir tags et wikilinks.
+# Chaque branche commence par un litteral ('[' ou '#') pour que le moteur
+# saute directement aux candidats; les assertions viennent apres le '#'.
+_BODY_RE = re.compile(
+    r'(\[\[([^\]|]+)(?:\|[^\]]+)?\]\])'
+    r'|#(?:(?<=^#)(\s)|(?<![#\w]#)([a-zA-Z][a-zA-Z0-9_/-]*))',
+    re.MULTILINE
+)
+
+# Faux positifs de wikilinks a exclure (bash tests, code, etc.), en deux
+# regex: les motifs ancres au debut (match) et ceux cherches partout (search).
+_WIKILINK_EXCLUDE_PREFIX_RE = re.compile(
+    r'[\s!\-$"\']'          # Commence par espace, !, -, $var ou quote
+    r'|https?://'            # URLs
+    r'|[0-9]+$',             # Nombres seuls (faux positifs)
+    re.IGNORECASE
+)
+_WIKILINK_EXCLUDE_SEARCH_RE = re.compile(
+    r'\s(?:==|!=|<=|>=)\s'   # Operateurs de comparaison
+    r'|\.(?:jpg|jpeg|png|gif|svg|pdf|mp3|mp4|webp)(?:$|#)',  # Fichiers media/PDF (embeds, annotations Zotero)
+    re.IGNORECASE
+)
+
 
 def extract_frontmatter(content: str) -> tuple[dict, str]:
     """
@@ -18,16 +80,16 @@ def extract_frontmatter(content: str) -> tuple[dict, str]:
     if not content.startswith('---'):
         return {}, content
 
-    # Chercher la fin du frontmatter
-    end_match = re.search(r'\n---\s*\n', content[3:])
+    # Chercher la fin du frontmatter (dans le debut de la note seulement)
+    end_match = _FRONTMATTER_END_RE.search(content, 3, FRONTMATTER_MAX_SIZE)
     if not end_match:
         return {}, content
 
-    yaml_content = content[3:end_match.start() + 3]
-    rest_content = content[end_match.end() + 3:]
+    yaml_content = content[3:end_match.start()]
+    rest_content = content[end_match.end():]
 
     try:
-        frontmatter = yaml.safe_load(yaml_content) or {}
+        frontmatter = yaml.load(yaml_content, Loader=_YAML_LOADER) or {}
     except yaml.YAMLError:
         frontmatter = {}
 
@@ -47,34 +109,19 @@ def extract_wikilinks(content: str) -> list[str]:
     - Tests bash [[ -f file ]]
     - Code entre crochets
     """
-    pattern = r'\[\[([^\]|]+)(?:\|[^\]]+)?\]\]'
-    matches = re.findall(pattern, content)
-
-    # Patterns a exclure (bash tests, code, etc.)
-    exclude_patterns = [
-        r'^[\s!-]',           # Commence par espace, ! ou -
-        r'^\$',               # Variables shell $var
-        r'^["\']',            # Commence par quote
-        r'\s(==|!=|<=|>=)\s', # Operateurs de comparaison
-        r'^https?://',        # URLs
-        r'\.(jpg|jpeg|png|gif|svg|pdf|mp3|mp4|webp)($|#)',  # Fichiers media/PDF (embeds et annotations)
-        r'\.pdf#',            # Annotations PDF (Zotero, etc.)
-        r'^[0-9]+$',          # Nombres seuls (faux positifs)
-    ]
+    return _clean_wikilinks(_WIKILINK_RE.findall(content))
+
 
+def _clean_wikilinks(matches: list[str]) -> list[str]:
+    """Filtre les faux positifs et normalise les cibles de wikilinks."""
     # Normaliser les chemins (enlever .md si present)
     links = []
     for match in matches:
         link = match.strip()
 
         # Verifier si c'est un faux positif
-        is_false_positive = False
-        for exc_pattern in exclude_patterns:
-            if re.search(exc_pattern, link, re.IGNORECASE):
-                is_false_positive = True
-                break
-
-        if is_false_positive:
+        if (_WIKILINK_EXCLUDE_PREFIX_RE.match(link)
+                or _WIKILINK_EXCLUDE_SEARCH_RE.search(link)):
             continue
 
         if link.endswith('.md'):
@@ -86,7 +133,8 @@ def extract_wikilinks(content: str) -> list[str]:
 
         links.append(link)
 
-    return list(set(links))  # Deduplicate
+    # Deduplique en gardant l'ordre d'apparition (sortie stable d'un scan a l'autre)
+    return list(dict.fromkeys(links))
 
 
 def extract_tags(content: str, frontmatter: dict = None) -> list[str]:
@@ -97,7 +145,13 @@ def extract_tags(content: str, frontmatter: dict = None) -> list[str]:
     - Tags inline (#tag)
     - Tags du frontmatter (tags: [...])
     """
-    tags = set()
+    # Tags inline (exclure les headers et les liens)
+    return _merge_tags(frontmatter, _TAG_RE.findall(content))
+
+
+def _merge_tags(frontmatter: Optional[dict], inline_tags: list[str]) -> list[str]:
+    """Combine les tags du frontmatter et les tags inline, tries."""
+    tags = set(inline_tags)
 
     # Tags du frontmatter
     if frontmatter:
@@ -107,13 +161,7 @@ def extract_tags(content: str, frontmatter: dict = None) -> list[str]:
         elif isinstance(fm_tags, str):
             tags.add(fm_tags)
 
-    # Tags inline (exclure les headers et les liens)
-    # Pattern: #tag mais pas ##header ni #[[link]]
-    pattern = r'(?<![#\w])#([a-zA-Z][a-zA-Z0-9_/-]*)'
-    matches = re.findall(pattern, content)
-    tags.update(matches)
-
-    return sorted(list(tags))
+    return sorted(tags)
 
 
 def extract_title(content: str, frontmatter: dict = None, filename: str = None) -> str:
@@ -125,14 +173,19 @@ def extract_title(content: str, frontmatter: dict = None, filename: str = None)
     2. Premier header H1
     3. Nom du fichier
     """
+    h1_match = _H1_RE.search(content)
+    return _pick_title(frontmatter, h1_match.group(1) if h1_match else None, filename)
+
+
+def _pick_title(frontmatter: Optional[dict], h1: Optional[str], filename: Optional[str]) -> str:
+    """Titre selon la priorite frontmatter > H1 > nom de fichier."""
     # 1. Frontmatter
     if frontmatter and frontmatter.get('title'):
         return frontmatter['title']
 
     # 2. Premier H1
-    h1_match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
-    if h1_match:
-        return h1_match.group(1).strip()
+    if h1 is not None:
+        return h1.strip()
 
     # 3. Nom du fichier
     if filename:
@@ -141,77 +194,326 @@ def extract_title(content: str, frontmatter: dict = None, filename: str = None)
     return "Sans titre"
 
 
+def _scan_body(body: str) -> tuple[Optional[str], list[str], list[str]]:
+    """
+    Extrait H1, tags inline et cibles de wikilinks en un seul parcours.
+
+    Donne les memes resultats que extract_title/extract_tags/
+    extract_wikilinks appeles separement.
+
+    Returns:
+        tuple: (premier H1 ou None, tags inline, cibles brutes des wikilinks)
+    """
+    tags = []
+    links = []
+    has_h1 = False
+
+    for span, link, h1_space, tag in _BODY_RE.findall(body):
+        if tag:
+            tags.append(tag)
+        elif link:
+            links.append(link)
+            # Un lien peut contenir des tags ("[[#tag]]") ou, s'il s'etend sur
+            # plusieurs lignes, un H1, qu'une recherche separee aurait trouves
+            if '#' in span:
+                tags.extend(_TAG_RE.findall(span))
+                has_h1 = has_h1 or '\n#' in span
+        elif h1_space:
+            has_h1 = True
+
+    h1 = None
+    if has_h1:
+        # Le premier H1 est en general en tete de note: recherche courte
+        h1_match = _H1_RE.search(body)
+        if h1_match:
+            h1 = h1_match.group(1)
+
+    return h1, tags, links
+
+
 def compute_hash(content: str) -> str:
-    """Calcule le hash MD5 du contenu pour detection de changements."""
-    return hashlib.md5(content.encode('utf-8')).hexdigest()
+    """Calcule le hash BLAKE3 du contenu pour detection de changements."""
+    return blake3.blake3(content.encode('utf-8')).hexdigest()
+
+
+def _read_note(path: Path, size: int) -> tuple[str, Optional[str]]:
+    """
+    Lit le contenu d'une note, comme read_text (fins de ligne normalisees).
+
+    Les grosses notes sont projetees en memoire: le texte est decode
+    directement depuis la projection, sans copie intermediaire en bytes.
+    Si le fichier ne contient pas de '\r', le texte decode reencode a
+    l'identique et le hash est calcule sur la projection elle-meme.
+
+    Returns:
+        tuple: (contenu, hash ou None s'il reste a calculer)
+    """
+    if size < MMAP_MIN_SIZE:
+        return path.read_text(encoding='utf-8'), None
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        content = str(mm, 'utf-8')
+        if mm.find(b'\r') == -1:
+            return content, blake3.blake3(mm).hexdigest()
 
+    # Memes fins de ligne que le mode texte (newline=None)
+    return content.replace('\r\n', '\n').replace('\r', '\n'), None
 
-def parse_note(path: str) -> Optional[dict]:
+
+def parse_note(
+    path: str,
+    mtime_ns: Optional[int] = None,
+    size: Optional[int] = None
+) -> Optional[dict]:
     """
     Parse une note Obsidian complete.
 
     Args:
         path: Chemin absolu vers le fichier .md
+        mtime_ns: mtime deja connu (ex: via iter_vault_files), evite un stat
+        size: Taille en octets deja connue
 
     Returns:
-        dict avec: path, title, content, frontmatter, tags, wikilinks, modified, hash
+        dict avec: path, title, content, frontmatter, tags, wikilinks, modified,
+        mtime_ns, hash, size
     """
     path = Path(path)
 
-    if not path.exists() or not path.suffix == '.md':
+    if not path.suffix == '.md':
         return None
 
     try:
-        content = path.read_text(encoding='utf-8')
+        if mtime_ns is None or size is None:
+            st = path.stat()
+            mtime_ns, size = st.st_mtime_ns, st.st_size
+        content, content_hash = _read_note(path, size)
     except Exception:
         return None
 
     frontmatter, body = extract_frontmatter(content)
+    h1, inline_tags, links = _scan_body(body)
 
     return {
         "path": str(path),
         "relative_path": path.name,
-        "title": extract_title(body, frontmatter, path.name),
+        "title": _pick_title(frontmatter, h1, path.name),
         "content": body,
         "raw_content": content,
         "frontmatter": frontmatter,
-        "tags": extract_tags(body, frontmatter),
-        "wikilinks": extract_wikilinks(body),
-        "modified": os.path.getmtime(path),
-        "hash": compute_hash(content),
-        "size": len(content)
+        "tags": _merge_tags(frontmatter, inline_tags),
+        "wikilinks": _clean_wikilinks(links),
+        "modified": mtime_ns / 1e9,
+        "mtime_ns": mtime_ns,
+        "hash": content_hash or compute_hash(content),
+        "size": size
     }
 
 
-def scan_vault(vault_path: str, exclude_folders: list[str] = None) -> list[dict]:
+def iter_vault_files(
+    vault_path: str,
+    exclude_folders: list[str] = None,
+    recursive: bool = True
+) -> Iterator[tuple[str, int, int]]:
     """
-    Scanne un vault Obsidian et parse toutes les notes.
+    Parcourt les fichiers .md du vault sans les lire.
+
+    Parcours en profondeur avec os.scandir: is_dir()/is_file() utilisent le
+    type fourni par le systeme de fichiers et le stat de chaque DirEntry est
+    mis en cache. Les dossiers exclus ne sont jamais parcourus. Le stat est
+    transmis a parse_note pour eviter un second appel systeme.
 
     Args:
         vault_path: Chemin vers le vault
         exclude_folders: Dossiers a ignorer (ex: ['.obsidian', '.trash'])
+        recursive: Si False, seuls les fichiers a la racine de vault_path
 
-    Returns:
-        Liste de notes parsees
+    Yields:
+        Tuples (chemin absolu, mtime_ns, taille en octets)
     """
-    vault = Path(vault_path)
-    exclude = set(exclude_folders or ['.obsidian', '.trash', '.git'])
+    exclude = frozenset(exclude_folders or ['.obsidian', '.trash', '.git'])
+
+    stack = [str(vault_path)]
+
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        if recursive and entry.name not in exclude:
+                            stack.append(entry.path)
+                    elif entry.name.endswith('.md') and entry.is_file():
+                        st = entry.stat()
+                        yield entry.path, st.st_mtime_ns, st.st_size
+        except OSError:
+            continue
 
-    notes = []
 
-    for md_file in vault.rglob('*.md'):
-        # Verifier si dans un dossier exclu
-        parts = md_file.relative_to(vault).parts
-        if any(part in exclude for part in parts):
-            continue
+def parse_notes(
+    files: list[tuple[str, int, int]],
+    processes: bool = True
+) -> Iterator[Optional[dict]]:
+    """
+    Parse plusieurs notes, en parallele sur tous les coeurs pour les gros lots.
+
+    Utilise des processus demarres par fork quand il est disponible (le
+    contexte est choisi explicitement: spawn/forkserver, defauts sur macOS
+    et Python >= 3.14, reimporteraient tout dans chaque processus). Sinon
+    (Windows, processes=False, ou pool impossible a demarrer/casse en cours
+    de route), bascule sur des threads: la lecture et l'extension YAML en C
+    liberent en partie le GIL.
+
+    Args:
+        files: Tuples (chemin, mtime_ns, taille) issus de iter_vault_files
+        processes: False pour n'utiliser que des threads. A passer depuis
+            un processus multithread (serveur MCP): fork n'y copie que le
+            thread appelant, un verrou tenu par un autre thread resterait
+            bloque dans les processus enfants.
+
+    Yields:
+        Notes parsees (None si echec), dans l'ordre de files
+    """
+    if len(files) < PARALLEL_PARSE_MIN_NOTES:
+        for path, mtime_ns, size in files:
+            yield parse_note(path, mtime_ns, size)
+        return
+
+    paths, mtimes, sizes = zip(*files)
+    done = 0
+
+    if processes and 'fork' in multiprocessing.get_all_start_methods():
+        try:
+            with ProcessPoolExecutor(
+                max_workers=os.cpu_count(),
+                mp_context=multiprocessing.get_context('fork')
+            ) as executor:
+                for note in executor.map(parse_note, paths, mtimes, sizes, chunksize=32):
+                    yield note
+                    done += 1
+            return
+        except (OSError, BrokenProcessPool):
+            pass
+
+    # Reprendre apres la derniere note deja produite
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        yield from executor.map(parse_note, paths[done:], mtimes[done:], sizes[done:])
+
+
+def _scan_cache_entry(note: dict) -> Optional[dict]:
+    """
+    Entree de cache d'une note: ses seuls champs SCAN_CACHE_FIELDS.
+
+    None si le titre ou un tag n'est pas une chaine (ex: date YAML): relu
+    depuis le JSON, il reviendrait sous une autre forme. La note est alors
+    reparsee a chaque scan.
+    """
+    entry = {field: note[field] for field in SCAN_CACHE_FIELDS}
+    if not isinstance(entry['title'], str) or not all(isinstance(t, str) for t in entry['tags']):
+        return None
+    return entry
+
+
+def scan_vault(
+    vault_path: str,
+    exclude_folders: list[str] = None,
+    cache: Optional[dict] = None,
+    note_filter: Optional[Callable[[dict], bool]] = None,
+    recursive: bool = True,
+    processes: bool = True
+) -> Iterator[dict]:
+    """
+    Scanne un vault Obsidian et parse toutes les notes.
+
+    Les notes sont produites au fur et a mesure: l'appelant qui n'a besoin
+    que de quelques champs ne garde pas tout le vault en memoire.
 
-        note = parse_note(str(md_file))
-        if note:
+    Args:
+        vault_path: Chemin vers le vault
+        exclude_folders: Dossiers a ignorer (ex: ['.obsidian', '.trash'])
+        cache: dict chemin -> metadonnees d'un scan precedent (voir
+            load_scan_cache). Une note dont le mtime et la taille n'ont pas
+            change n'est pas relue. Mis a jour sur place: notes parsees
+            ajoutees, notes disparues de vault_path retirees. Avec un cache,
+            les notes produites n'ont que les champs SCAN_CACHE_FIELDS.
+        note_filter: Si fourni, seules les notes pour lesquelles il renvoie
+            True sont produites (ecartees avant copie; le cache garde tout)
+        recursive: Si False, seules les notes a la racine de vault_path
+        processes: Transmis a parse_notes
+
+    Yields:
+        Notes parsees
+    """
+    files = list(iter_vault_files(vault_path, exclude_folders, recursive))
+
+    cached = [None] * len(files)
+    if cache is not None:
+        # Oublier les notes supprimees (ou exclues) sous vault_path: le
+        # cache ne depasse pas la taille du vault
+        seen = {path for path, _, _ in files}
+        prefix = os.path.join(str(vault_path), '')
+        for path in list(cache):
+            if (path.startswith(prefix) and path not in seen
+                    and (recursive or os.sep not in path[len(prefix):])):
+                cache.pop(path, None)
+
+        for i, (path, mtime_ns, size) in enumerate(files):
+            note = cache.get(path)
+            if note and note.get('mtime_ns') == mtime_ns and note.get('size') == size:
+                cached[i] = note
+
+    parsed = parse_notes([f for f, hit in zip(files, cached) if hit is None], processes)
+
+    for (path, _, _), note in zip(files, cached):
+        if note is None:
+            note = next(parsed)
+            if cache is not None:
+                entry = _scan_cache_entry(note) if note else None
+                if entry:
+                    cache[path] = entry
+                else:
+                    cache.pop(path, None)
+                if note:
+                    note = entry or {field: note[field] for field in SCAN_CACHE_FIELDS}
+        if note and (note_filter is None or note_filter(note)):
+            # Copie: le cache garde la note telle que parsee
+            note = dict(note)
             # Ajouter le chemin relatif au vault
-            note['vault_path'] = str(md_file.relative_to(vault))
-            notes.append(note)
+            note['vault_path'] = os.path.relpath(path, vault_path)
+            yield note
+
+
+def load_scan_cache(cache_path: str) -> dict:
+    """
+    Charge le cache de scan_vault persiste par save_scan_cache.
+
+    Les entrees sans les champs attendus (ancien format) sont ignorees.
+
+    Returns:
+        dict chemin -> metadonnees (vide si absent ou illisible)
+    """
+    try:
+        cache = orjson.loads(Path(cache_path).read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+    if not isinstance(cache, dict):
+        return {}
+    return {
+        path: entry for path, entry in cache.items()
+        if isinstance(entry, dict) and entry.keys() == set(SCAN_CACHE_FIELDS)
+    }
 
-    return notes
+
+def save_scan_cache(cache: dict, cache_path: str):
+    """
+    Persiste le cache de scan_vault.
+
+    Rien n'est ecrit si le dossier de cache_path n'existe pas: lister les
+    notes ne cree pas de base.
+    """
+    cache_file = Path(cache_path)
+    if not cache_file.parent.is_dir():
+        return
+    cache_file.write_bytes(orjson.dumps(cache))
 
 
 if __name__ == "__main__":
@@ -220,7 +522,7 @@ if __name__ == "__main__":
 
     if len(sys.argv) > 1:
         vault_path = sys.argv[1]
-        notes = scan_vault(vault_path)
+        notes = list(scan_vault(vault_path))
         print(f"Trouve {len(notes)} notes dans {vault_path}")
 
         for note in notes[:5]:
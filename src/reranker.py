@@ -0,0 +1,71 @@
+"""
+Reranker local (cross-encoder ONNX) pour obsidian-mcp.
+
+Alternative hors ligne au reranking Cohere: un modele type bge-reranker
+exporte en ONNX (idealement quantifie int8) et son tokenizer.json.
+onnxruntime et tokenizers sont importes a la creation du reranker.
+"""
+
+import logging
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class LocalReranker:
+    """Cross-encoder ONNX: score toutes les paires (requete, document) en un lot."""
+
+    def __init__(self, model_dir: str, model_file: str = "model.onnx", max_length: int = 512):
+        """
+        Args:
+            model_dir: Dossier contenant le modele ONNX et tokenizer.json
+            model_file: Nom du fichier ONNX dans model_dir
+            max_length: Longueur max (tokens) d'une paire requete + document
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        if self.tokenizer.padding is None:
+            # Le masque d'attention neutralise le padding
+            self.tokenizer.enable_padding()
+
+        self.session = ort.InferenceSession(
+            str(model_dir / model_file),
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        logger.info(f"Reranker local charge: {model_dir / model_file}")
+
+    def score(self, query: str, documents: list[str]) -> np.ndarray:
+        """Score de pertinence (0-1) de chaque document pour la requete."""
+        encodings = self.tokenizer.encode_batch([(query, doc) for doc in documents])
+
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+        }
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        logits = self.session.run(None, feeds)[0].reshape(len(documents), -1)[:, -1]
+        return 1 / (1 + np.exp(-logits.astype(np.float64)))
+
+    def rerank(self, query: str, documents: list[str], top_n: int) -> list[tuple[int, float]]:
+        """
+        Ordonne les documents par pertinence.
+
+        Returns:
+            Liste de (index du document, score), meilleurs d'abord
+        """
+        if not documents:
+            return []
+
+        scores = self.score(query, documents)
+        order = np.argsort(-scores, kind='stable')[:top_n]
+        return [(int(i), float(scores[i])) for i in order]
@@ -4,16 +4,173 @@ Base sur ragdoc-mcp/src/hybrid_retriever.py mais sans chunking.
 """
 
 import logging
+import queue
+import re
+import shutil
 import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
 from typing import List, Dict, Tuple, Optional
-from collections import defaultdict
 
+import bm25s
 import numpy as np
-from rank_bm25 import BM25Okapi
+import orjson
 import chromadb
 
 logger = logging.getLogger(__name__)
 
+# Taille des pages lues depuis ChromaDB pour construire le corpus BM25
+CORPUS_PAGE_SIZE = 2000
+
+# Methodes de fusion BM25 + semantique (voir ObsidianRetriever._fuse)
+FUSION_METHODS = ("rrf", "cc", "dbsf")
+
+# Sequences alphanumeriques Unicode (\w sans '_') d'au moins 3 caracteres
+_TOKEN_RE = re.compile(r'[^\W_]{3,}')
+
+
+class QueryEmbeddingBatcher:
+    """
+    Regroupe les embeddings de requetes concurrentes en un seul appel.
+
+    Chaque appelant (thread) depose ses textes et attend son resultat; un
+    thread de fond attend jusqu'a max_wait secondes d'autres requetes (au plus
+    max_batch textes) puis fait un seul appel a embed_batch et redistribue
+    les embeddings.
+    """
+
+    def __init__(self, embed_batch, max_batch: int = 32, max_wait: float = 0.01):
+        """
+        Args:
+            embed_batch: Fonction list[str] -> embeddings (un par texte)
+            max_batch: Nombre max de textes par appel
+            max_wait: Fenetre de regroupement en secondes
+        """
+        self.embed_batch = embed_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: queue.Queue = queue.Queue()
+        # Protege _closed et l'ajout a la file: aucune requete n'est deposee
+        # apres le marqueur de fin
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __call__(self, texts: List[str]) -> list:
+        """
+        Embeddings de texts (bloquant), utilisable comme embedding_function.
+
+        Raises:
+            RuntimeError: Si le batcher est ferme
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("QueryEmbeddingBatcher ferme")
+            self._queue.put((texts, future))
+        return future.result()
+
+    def close(self):
+        """
+        Arrete le thread de fond.
+
+        Les requetes deja deposees sont traitees; les suivantes echouent.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+
+    def _run(self):
+        try:
+            self._serve()
+        finally:
+            # Thread arrete (close ou erreur fatale): refuser les nouvelles
+            # requetes et ne laisser aucun appelant bloque sur future.result()
+            with self._lock:
+                self._closed = True
+            self._drain(RuntimeError("QueryEmbeddingBatcher ferme"))
+
+    def _drain(self, error: Exception):
+        """Fait echouer les requetes restees dans la file."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                item[1].set_exception(error)
+
+    def _serve(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            items = [item]
+            count = len(item[0])
+            deadline = time.monotonic() + self.max_wait
+            while count < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    # Traiter le lot en cours, puis s'arreter
+                    self._queue.put(None)
+                    break
+                items.append(item)
+                count += len(item[0])
+
+            texts = [text for batch, _ in items for text in batch]
+            try:
+                embeddings = self.embed_batch(texts)
+            except BaseException as e:
+                for _, future in items:
+                    future.set_exception(e)
+                if not isinstance(e, Exception):
+                    raise
+                continue
+
+            start = 0
+            for batch, future in items:
+                future.set_result(embeddings[start:start + len(batch)])
+                start += len(batch)
+
+
+class _BM25Corpus:
+    """
+    Etat publie de l'index BM25: corpus, tokens encodes et index.
+
+    Jamais modifie apres publication (hors cache des masques): une mise a
+    jour publie un nouvel objet par une seule affectation, et une recherche
+    qui a lu l'objet courant reste coherente jusqu'au bout.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        docs: List[str],
+        metadatas: List[dict],
+        token_ids: Optional[List[np.ndarray]] = None,
+        bm25: Optional[bm25s.BM25] = None
+    ):
+        self.ids = ids
+        self.docs = docs
+        self.metadatas = metadatas
+        # Tokens encodes par document (None apres rechargement du disque)
+        self.token_ids = token_ids
+        self.bm25 = bm25
+        self.id_to_idx = {doc_id: i for i, doc_id in enumerate(ids)}
+        # Masques des conditions where, propres a ce corpus
+        self.mask_cache: dict[tuple, np.ndarray] = {}
+
 
 class ObsidianRetriever:
     """
@@ -28,73 +185,209 @@ class ObsidianRetriever:
     def __init__(
         self,
         collection: chromadb.Collection,
-        embedding_function=None
+        embedding_function=None,
+        db_path: Optional[str] = None
     ):
         """
         Args:
             collection: Collection ChromaDB
             embedding_function: Fonction pour embedder les requetes
+            db_path: Dossier de la base ChromaDB. Si fourni, l'index BM25 y est
+                persiste (sous-dossier bm25_index) et recharge au demarrage
+                tant que la base n'a pas change.
         """
         self.collection = collection
         self.embedding_function = embedding_function
-
-        # Index BM25 (lazy init)
-        self.docs: List[str] = []
-        self.ids: List[str] = []
-        self.metadatas: List[dict] = []
-        self.bm25: Optional[BM25Okapi] = None
-        self._id_to_idx: dict[str, int] = {}
+        self.db_path = Path(db_path) if db_path else None
+
+        # Index BM25 (lazy init), remplace en bloc a chaque mise a jour
+        self._corpus = _BM25Corpus([], [], [])
+        self._vocab: dict[str, int] = {}
+        # Ecritures pas encore indexees: id -> (texte, metadonnees), ou None
+        # si supprime. Appliquees en un seul reindexage, en arriere-plan,
+        # a la prochaine recherche.
+        self._pending: dict[str, Optional[tuple]] = {}
+        # Protege _bm25_building, _bm25_updating et _pending
         self._bm25_lock = threading.Lock()
         self._bm25_building = False
+        self._bm25_updating = False
+        # Une seule construction ou mise a jour de l'index a la fois
+        # (_vocab est partage)
+        self._index_lock = threading.Lock()
+
+    @property
+    def bm25(self) -> Optional[bm25s.BM25]:
+        return self._corpus.bm25
+
+    @property
+    def docs(self) -> List[str]:
+        return self._corpus.docs
+
+    @property
+    def ids(self) -> List[str]:
+        return self._corpus.ids
+
+    @property
+    def metadatas(self) -> List[dict]:
+        return self._corpus.metadatas
 
     def _tokenize(self, text: str) -> List[str]:
         """Tokenisation simple pour notes personnelles."""
-        # Lowercase et split sur espaces/ponctuation
-        text = text.lower()
-        # Garder les mots alphanumeriques
-        tokens = []
-        current = []
-        for char in text:
-            if char.isalnum():
-                current.append(char)
-            else:
-                if current:
-                    tokens.append(''.join(current))
-                    current = []
-        if current:
-            tokens.append(''.join(current))
+        # Lowercase, mots alphanumeriques (accents compris) de 3+ caracteres
+        return _TOKEN_RE.findall(text.lower())
+
+    def _encode(self, text: str) -> np.ndarray:
+        """Tokenise un texte en identifiants du vocabulaire (etendu au besoin)."""
+        vocab = self._vocab
+        tokens = self._tokenize(text)
+        return np.fromiter(
+            (vocab.setdefault(token, len(vocab)) for token in tokens),
+            dtype=np.int32,
+            count=len(tokens)
+        )
 
-        # Filtrer les mots trop courts
-        return [t for t in tokens if len(t) > 2]
+    def _index_token_ids(self, token_ids: List[np.ndarray]) -> bm25s.BM25:
+        """Construit un index BM25 depuis des documents deja encodes."""
+        bm25 = bm25s.BM25()
+        # Copie: bm25s complete le vocabulaire, qui doit rester celui de la matrice
+        bm25.index(([ids.tolist() for ids in token_ids], dict(self._vocab)), show_progress=False)
+        return bm25
 
-    def _build_bm25_index(self):
-        """Construit l'index BM25 depuis ChromaDB."""
-        all_data = self.collection.get(include=["documents", "metadatas"])
+    @property
+    def _index_dir(self) -> Optional[Path]:
+        return self.db_path / "bm25_index" if self.db_path else None
 
-        self.docs = all_data['documents'] or []
-        self.ids = all_data['ids'] or []
-        self.metadatas = all_data['metadatas'] or []
-        self._id_to_idx = {doc_id: i for i, doc_id in enumerate(self.ids)}
+    def _source_fingerprint(self) -> list:
+        """
+        Empreinte de la base ChromaDB: nombre de documents et mtime des
+        fichiers SQLite (toute ecriture modifie la base ou son WAL).
+        """
+        mtimes = []
+        for name in ("chroma.sqlite3", "chroma.sqlite3-wal"):
+            try:
+                mtimes.append((self.db_path / name).stat().st_mtime_ns)
+            except OSError:
+                mtimes.append(0)
+        return [self.collection.count()] + mtimes
+
+    def _save_bm25_index(self, corpus: _BM25Corpus, fingerprint: list):
+        """
+        Persiste l'index BM25 et le corpus (ids, documents, metadonnees).
+
+        Ecrit dans un dossier temporaire puis le renomme: un autre processus
+        qui a projete l'ancien index en memoire n'est pas affecte.
+        """
+        index_dir = self._index_dir
+        tmp_dir = index_dir.with_name(index_dir.name + ".tmp")
+        try:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            corpus.bm25.save(str(tmp_dir), show_progress=False)
+            # Le corpus est ecrit en dernier: sa presence valide l'index
+            (tmp_dir / "corpus.json").write_bytes(orjson.dumps({
+                "fingerprint": fingerprint,
+                "ids": corpus.ids,
+                "docs": corpus.docs,
+                "metadatas": corpus.metadatas,
+            }))
+            shutil.rmtree(index_dir, ignore_errors=True)
+            tmp_dir.rename(index_dir)
+        except Exception as e:
+            logger.warning(f"Impossible de persister l'index BM25: {e}")
+
+    def _load_bm25_index(self) -> Optional[_BM25Corpus]:
+        """
+        Recharge l'index BM25 persiste s'il correspond a l'etat de la base.
 
-        if not self.docs:
+        Les matrices sont projetees en memoire (mmap): seules les colonnes
+        des termes interroges sont lues depuis le disque.
+        """
+        corpus_path = self._index_dir / "corpus.json"
+        if not corpus_path.exists():
+            return None
+
+        try:
+            saved = orjson.loads(corpus_path.read_bytes())
+            if saved["fingerprint"] != self._source_fingerprint():
+                return None
+
+            bm25 = bm25s.BM25.load(str(self._index_dir), mmap=True, show_progress=False)
+        except Exception as e:
+            logger.warning(f"Index BM25 persiste illisible: {e}")
+            return None
+
+        logger.info(f"Index BM25 recharge: {len(saved['docs'])} notes")
+        return _BM25Corpus(saved["ids"], saved["docs"], saved["metadatas"], bm25=bm25)
+
+    def _build_bm25_index(self):
+        """Construit l'index BM25 depuis ChromaDB (ou le recharge du disque)."""
+        with self._index_lock:
+            # Les ecritures deja recues sont dans ChromaDB, relu ci-dessous
+            with self._bm25_lock:
+                self._pending.clear()
+
+            fingerprint = None
+            if self.db_path:
+                corpus = self._load_bm25_index()
+                if corpus is not None:
+                    self._corpus = corpus
+                    return
+                # Avant la lecture: une ecriture concurrente invalidera l'index
+                fingerprint = self._source_fingerprint()
+
+            self._build_from_collection(fingerprint)
+
+    def _build_from_collection(self, fingerprint: Optional[list]):
+        """Lit tout le corpus dans ChromaDB, l'indexe et le persiste si fingerprint."""
+        # Lecture par pages: pas de pic memoire sur la reponse ChromaDB complete
+        docs, ids, metadatas = [], [], []
+        offset = 0
+        while True:
+            page = self.collection.get(
+                include=["documents", "metadatas"],
+                limit=CORPUS_PAGE_SIZE,
+                offset=offset
+            )
+            if not page['ids']:
+                break
+            docs.extend(page['documents'])
+            ids.extend(page['ids'])
+            metadatas.extend(page['metadatas'])
+            offset += len(page['ids'])
+            logger.debug(f"Corpus BM25: {offset} notes lues")
+
+        if not docs:
+            self._corpus = _BM25Corpus(ids, docs, metadatas)
             logger.warning("Aucun document dans la collection")
             return
 
         # Tokeniser le corpus
-        tokenized_corpus = [self._tokenize(doc) for doc in self.docs]
+        self._vocab = {}
+        token_ids = [self._encode(doc) for doc in docs]
+
+        # Creer l'index BM25 (scores precalcules dans une matrice creuse)
+        corpus = _BM25Corpus(ids, docs, metadatas, token_ids, self._index_token_ids(token_ids))
+        self._corpus = corpus
+        logger.info(f"Index BM25 construit: {len(docs)} notes")
 
-        # Creer l'index BM25
-        self.bm25 = BM25Okapi(tokenized_corpus)
-        logger.info(f"Index BM25 construit: {len(self.docs)} notes")
+        if fingerprint is not None:
+            self._save_bm25_index(corpus, fingerprint)
 
     def ensure_bm25_index(self, background: bool = True) -> bool:
         """
         S'assure que l'index BM25 est pret.
 
+        Les ecritures en attente (add_documents, remove_documents) sont
+        appliquees: en arriere-plan si background (le corpus courant reste
+        servi en attendant), sinon avant de rendre la main.
+
         Returns:
             True si pret, False si en construction
         """
         if self.bm25 is not None:
+            if background:
+                self._apply_pending_in_background()
+            else:
+                self._apply_pending()
             return True
 
         with self._bm25_lock:
@@ -119,9 +412,129 @@ class ObsidianRetriever:
         build_worker()
         return self.bm25 is not None
 
+    def add_documents(self, ids: List[str], docs: List[str], metadatas: List[dict]):
+        """
+        Ajoute ou remplace des documents dans l'index BM25 sans relire ChromaDB.
+
+        Les documents sont seulement mis en attente: la matrice de scores
+        (idf et longueur moyenne dependent de tout le corpus) est recalculee
+        une fois, en arriere-plan a partir de la prochaine recherche, pour
+        toutes les ecritures accumulees. Sans index construit ni en
+        construction, ne fait rien (il sera construit depuis ChromaDB a la
+        prochaine recherche).
+        """
+        with self._bm25_lock:
+            if self.bm25 is None and not self._bm25_building:
+                return
+            for doc_id, text, metadata in zip(ids, docs, metadatas):
+                self._pending[doc_id] = (text, metadata)
+
+    def remove_documents(self, ids: List[str]):
+        """Retire des documents de l'index BM25 sans relire ChromaDB (voir add_documents)."""
+        with self._bm25_lock:
+            if self.bm25 is None and not self._bm25_building:
+                return
+            for doc_id in ids:
+                self._pending[doc_id] = None
+
+    def _apply_pending_in_background(self):
+        """Lance _apply_pending dans un thread, sauf s'il tourne deja."""
+        with self._bm25_lock:
+            if self._bm25_updating or not self._pending:
+                return
+            self._bm25_updating = True
+
+        def update_worker():
+            try:
+                # Les ecritures arrivees pendant un reindexage sont prises
+                # par le suivant
+                while self._pending and self.bm25 is not None:
+                    self._apply_pending()
+            except Exception as e:
+                logger.warning(f"Mise a jour de l'index BM25 impossible: {e}")
+            finally:
+                with self._bm25_lock:
+                    self._bm25_updating = False
+
+        threading.Thread(target=update_worker, daemon=True).start()
+
+    def _apply_pending(self):
+        """
+        Reindexe le corpus avec les ecritures en attente et le publie.
+
+        Seuls les documents modifies sont tokenises; la matrice est
+        recalculee depuis les tokens en cache. Rien n'est persiste: l'index
+        sur disque, dont l'empreinte ne correspond plus a la base, sera
+        reconstruit au prochain demarrage.
+
+        Les ecritures ne quittent _pending qu'une fois le nouveau corpus
+        publie: _fetch_payload n'en sert jamais l'ancienne version.
+        """
+        if not self._pending:
+            return
+
+        with self._index_lock:
+            with self._bm25_lock:
+                pending = dict(self._pending)
+            corpus = self._corpus
+            if pending and corpus.bm25 is not None:
+                self._corpus = self._updated_corpus(corpus, pending)
+
+            # Sans index, la prochaine recherche le reconstruit depuis
+            # ChromaDB. Une ecriture plus recente reste en attente.
+            with self._bm25_lock:
+                for doc_id, entry in pending.items():
+                    if doc_id in self._pending and self._pending[doc_id] is entry:
+                        del self._pending[doc_id]
+
+    def _updated_corpus(self, corpus: _BM25Corpus, pending: dict) -> _BM25Corpus:
+        """Nouveau corpus: corpus avec les ecritures pending, reindexe."""
+        token_ids = corpus.token_ids
+        if token_ids is None:
+            # Index recharge du disque: encoder le corpus une fois
+            self._vocab = {}
+            token_ids = [self._encode(doc) for doc in corpus.docs]
+
+        # Nouvelles listes: les recherches en cours gardent l'ancien corpus
+        ids, docs = corpus.ids[:], corpus.docs[:]
+        metadatas, token_ids = corpus.metadatas[:], token_ids[:]
+        positions = dict(corpus.id_to_idx)
+        removed = set()
+
+        for doc_id, entry in pending.items():
+            idx = positions.get(doc_id)
+            if entry is None:
+                if idx is not None:
+                    removed.add(idx)
+                continue
+            text, metadata = entry
+            encoded = self._encode(text)
+            if idx is None:
+                positions[doc_id] = len(ids)
+                ids.append(doc_id)
+                docs.append(text)
+                metadatas.append(metadata)
+                token_ids.append(encoded)
+            else:
+                docs[idx] = text
+                metadatas[idx] = metadata
+                token_ids[idx] = encoded
+
+        if removed:
+            keep = [i for i in range(len(ids)) if i not in removed]
+            ids = [ids[i] for i in keep]
+            docs = [docs[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+            token_ids = [token_ids[i] for i in keep]
+
+        bm25 = self._index_token_ids(token_ids) if ids else None
+        return _BM25Corpus(ids, docs, metadatas, token_ids, bm25)
+
     def rebuild_index(self):
         """Force la reconstruction de l'index BM25."""
-        self.bm25 = None
+        self._corpus = _BM25Corpus([], [], [])
+        if self.db_path:
+            shutil.rmtree(self._index_dir, ignore_errors=True)
         self.ensure_bm25_index(background=False)
 
     def search(
@@ -130,7 +543,9 @@ class ObsidianRetriever:
         top_k: int = 10,
         alpha: float = 0.7,
         folder: Optional[str] = None,
-        tags: Optional[List[str]] = None
+        tags: Optional[List[str]] = None,
+        fusion: str = "rrf",
+        rrf_k: int = 60
     ) -> List[Dict]:
         """
         Recherche hybride.
@@ -141,6 +556,8 @@ class ObsidianRetriever:
             alpha: Poids semantique (0.7 = 70% semantic, 30% BM25)
             folder: Filtrer par dossier
             tags: Filtrer par tags
+            fusion: Methode de fusion (FUSION_METHODS)
+            rrf_k: Constante k de la fusion RRF
 
         Returns:
             Liste de dicts avec: id, text, metadata, score
@@ -151,20 +568,22 @@ class ObsidianRetriever:
         # BM25 search
         bm25_results = []
         if alpha < 1.0:
-            self.ensure_bm25_index(background=False)
-            if self.bm25 is not None:
-                bm25_results = self._bm25_search(query, top_n=100, where=where)
+            # Premiere construction attendue; ensuite les ecritures en
+            # attente sont reindexees en arriere-plan et la recherche sert
+            # le corpus courant (_fetch_payload relit les notes modifiees)
+            self.ensure_bm25_index(background=self.bm25 is not None)
+            # Un seul corpus pour toute la recherche BM25
+            corpus = self._corpus
+            if corpus.bm25 is not None:
+                bm25_results = self._bm25_search(corpus, query, top_n=100, where=where)
 
         # Semantic search
-        semantic_results, payload = self._semantic_search(query, top_n=100, where=where)
+        semantic_results = self._semantic_search(query, top_n=100, where=where)
 
-        # Fusion RRF
-        fused = self._reciprocal_rank_fusion(
-            bm25_results, semantic_results, alpha=alpha, payload=payload
+        return self._fuse(
+            bm25_results, semantic_results, alpha=alpha, method=fusion, k=rrf_k, top_k=top_k
         )
 
-        return fused[:top_k]
-
     def find_similar(self, note_path: str, top_k: int = 5) -> List[Dict]:
         """
         Trouve les notes similaires a une note donnee.
@@ -182,7 +601,8 @@ class ObsidianRetriever:
                 where={"path": note_path},
                 include=["embeddings", "documents", "metadatas"]
             )
-            if not result['embeddings'] or not result['embeddings'][0]:
+            # Les embeddings peuvent etre un tableau numpy (pas de test de verite)
+            if result['embeddings'] is None or len(result['embeddings']) == 0:
                 return []
 
             note_embedding = result['embeddings'][0]
@@ -242,36 +662,55 @@ class ObsidianRetriever:
 
     def _bm25_search(
         self,
+        corpus: _BM25Corpus,
         query: str,
         top_n: int,
         where: Optional[dict] = None
     ) -> List[Tuple[str, float, int]]:
-        """Recherche BM25."""
-        if self.bm25 is None:
+        """Recherche BM25 dans corpus."""
+        if corpus.bm25 is None:
             return []
 
         tokenized_query = self._tokenize(query)
-        scores = self.bm25.get_scores(tokenized_query)
+        if not tokenized_query:
+            return []
+
+        if not where:
+            # Top-N directement depuis l'index creux
+            k = min(top_n, len(corpus.ids))
+            doc_indices, doc_scores = corpus.bm25.retrieve(
+                [tokenized_query], k=k, show_progress=False
+            )
+            return [
+                (corpus.ids[int(idx)], float(score), rank)
+                for rank, (idx, score) in enumerate(zip(doc_indices[0], doc_scores[0]))
+            ]
+
+        scores = corpus.bm25.get_scores(tokenized_query)
 
-        # Filtrer si necessaire
-        eligible = list(range(len(scores)))
-        if where:
+        # Filtrer (masques vectorises, sinon evaluation note par note)
+        mask = self._where_mask(corpus, where)
+        if mask is not None:
+            eligible = np.flatnonzero(mask)
+        else:
             eligible = [
-                i for i, meta in enumerate(self.metadatas)
+                i for i, meta in enumerate(corpus.metadatas)
                 if self._match_where(meta, where)
             ]
 
-        if not eligible:
+        if not len(eligible):
             return []
 
-        # Top-N
+        # Top-N: selection partielle O(N), puis tri des seuls k retenus
         scores_arr = np.asarray(scores)[eligible]
-        top_indices = np.argsort(scores_arr)[::-1][:top_n]
+        k = min(top_n, scores_arr.size)
+        top_indices = np.argpartition(-scores_arr, k - 1)[:k]
+        top_indices = top_indices[np.argsort(-scores_arr[top_indices], kind='stable')]
 
         results = []
         for rank, local_idx in enumerate(top_indices):
             global_idx = eligible[int(local_idx)]
-            doc_id = self.ids[global_idx]
+            doc_id = corpus.ids[global_idx]
             score = float(scores_arr[int(local_idx)])
             results.append((doc_id, score, rank))
 
@@ -282,10 +721,15 @@ class ObsidianRetriever:
         query: str,
         top_n: int,
         where: Optional[dict] = None
-    ) -> Tuple[List[Tuple[str, float, int]], Dict]:
-        """Recherche semantique via ChromaDB."""
+    ) -> List[Tuple[str, float, int]]:
+        """
+        Recherche semantique via ChromaDB.
+
+        Seules les distances sont demandees: les textes et metadonnees des
+        resultats retenus apres fusion sont recuperes ensuite (_fetch_payload).
+        """
         if self.embedding_function is None:
-            return [], {}
+            return []
 
         query_embedding = self.embedding_function([query])[0]
 
@@ -293,28 +737,97 @@ class ObsidianRetriever:
             query_embeddings=[query_embedding],
             n_results=top_n,
             where=where,
-            include=["documents", "metadatas", "distances"]
+            include=["distances"]
         )
 
         if not results['ids'] or not results['ids'][0]:
-            return [], {}
+            return []
+
+        return [
+            (doc_id, 1 - distance, rank)
+            for rank, (doc_id, distance) in enumerate(zip(
+                results['ids'][0], results['distances'][0]
+            ))
+        ]
+
+    def _fetch_payload(self, doc_ids: List[str]) -> Dict[str, tuple]:
+        """
+        Textes et metadonnees de doc_ids.
+
+        Pris dans le corpus BM25 en memoire quand il est charge, sinon lus
+        dans ChromaDB en une seule requete. Les notes modifiees depuis la
+        derniere mise a jour de l'index (en attente) sont lues dans ChromaDB.
 
-        semantic_results = []
+        Returns:
+            dict id -> (texte, metadonnees)
+        """
+        # Attente lue avant le corpus: une ecriture appliquee entre les deux
+        # est deja dans le corpus lu ensuite
+        with self._bm25_lock:
+            stale = self._pending.keys() & set(doc_ids)
+        corpus = self._corpus
         payload = {}
+        missing = []
+        for doc_id in doc_ids:
+            idx = corpus.id_to_idx.get(doc_id)
+            if idx is not None and doc_id not in stale:
+                payload[doc_id] = (corpus.docs[idx], corpus.metadatas[idx])
+            else:
+                missing.append(doc_id)
+
+        if missing:
+            fetched = self.collection.get(ids=missing, include=["documents", "metadatas"])
+            for doc_id, text, metadata in zip(
+                fetched['ids'], fetched['documents'], fetched['metadatas']
+            ):
+                payload[doc_id] = (text, metadata)
+
+        return payload
+
+    def _where_mask(self, corpus: _BM25Corpus, where: dict) -> Optional[np.ndarray]:
+        """
+        Evalue un filtre where sur tout le corpus BM25 d'un coup.
 
-        for rank, (doc_id, distance) in enumerate(zip(
-            results['ids'][0], results['distances'][0]
-        )):
-            similarity = 1 - distance
-            semantic_results.append((doc_id, similarity, rank))
+        Chaque condition feuille (champ, operateur, valeur) est calculee une
+        fois puis gardee en cache avec le corpus; les combinaisons $and/$or
+        sont des operations numpy.
 
-            if rank < len(results['documents'][0]):
-                payload[doc_id] = (
-                    results['documents'][0][rank],
-                    results['metadatas'][0][rank]
+        Returns:
+            Masque booleen (une entree par note), ou None si le filtre
+            contient un operateur non gere (utiliser _match_where)
+        """
+        if "$and" in where or "$or" in where:
+            op = "$and" if "$and" in where else "$or"
+            masks = [self._where_mask(corpus, c) for c in where[op]]
+            if any(m is None for m in masks):
+                return None
+            combine = np.logical_and if op == "$and" else np.logical_or
+            return combine.reduce(masks)
+
+        masks = []
+        for key, condition in where.items():
+            if isinstance(condition, dict):
+                if set(condition) != {"$contains"}:
+                    return None
+                cache_key = (key, "$contains", condition["$contains"])
+            else:
+                cache_key = (key, "$eq", condition)
+
+            mask = corpus.mask_cache.get(cache_key)
+            if mask is None:
+                mask = np.fromiter(
+                    (self._match_where(meta, {key: condition}) for meta in corpus.metadatas),
+                    dtype=bool,
+                    count=len(corpus.metadatas)
                 )
+                if len(corpus.mask_cache) >= 256:
+                    corpus.mask_cache.clear()
+                corpus.mask_cache[cache_key] = mask
+            masks.append(mask)
 
-        return semantic_results, payload
+        if not masks:
+            return np.ones(len(corpus.metadatas), dtype=bool)
+        return np.logical_and.reduce(masks)
 
     def _match_where(self, metadata: dict, where: dict) -> bool:
         """Evalue un filtre where simple."""
@@ -340,53 +853,76 @@ class ObsidianRetriever:
 
         return True
 
-    def _reciprocal_rank_fusion(
+    def _fuse(
         self,
         bm25_results: List[Tuple[str, float, int]],
         semantic_results: List[Tuple[str, float, int]],
         alpha: float = 0.7,
+        method: str = "rrf",
         k: int = 60,
-        payload: Optional[Dict] = None
+        top_k: Optional[int] = None
     ) -> List[Dict]:
-        """Fusion RRF des resultats."""
-        scores = defaultdict(lambda: {'bm25': 0, 'semantic': 0})
+        """
+        Fusion ponderee (alpha = poids semantique) des deux listes.
 
-        # BM25 contribution
-        for doc_id, raw_score, rank in bm25_results:
-            scores[doc_id]['bm25'] = 1 / (k + rank + 1)
-            scores[doc_id]['bm25_raw'] = raw_score
+        - rrf: rangs reciproques 1 / (k + rang + 1)
+        - cc: combinaison convexe des scores normalises min-max
+        - dbsf: scores normalises sur moyenne +/- 3 ecarts-types, bornes a [0, 1]
 
-        # Semantic contribution
-        for doc_id, raw_score, rank in semantic_results:
-            scores[doc_id]['semantic'] = 1 / (k + rank + 1)
-            scores[doc_id]['semantic_raw'] = raw_score
+        Un document absent d'une liste y compte pour 0. Les scores sont ranges
+        dans des tableaux numpy indexes par document (union des deux listes,
+        dans l'ordre d'apparition) et combines en une operation. Textes et
+        metadonnees ne sont recuperes que pour les top_k premiers.
+        """
+        if method not in FUSION_METHODS:
+            raise ValueError(f"Methode de fusion inconnue: {method}")
+
+        doc_ids = list(dict.fromkeys(
+            [doc_id for doc_id, _, _ in bm25_results] +
+            [doc_id for doc_id, _, _ in semantic_results]
+        ))
+        if not doc_ids:
+            return []
+        doc_index = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+
+        n = len(doc_ids)
+        bm25_fused = np.zeros(n)
+        semantic_fused = np.zeros(n)
+        bm25_raw = np.zeros(n)
+        semantic_raw = np.zeros(n)
+
+        for fused, raw, results in (
+            (bm25_fused, bm25_raw, bm25_results),
+            (semantic_fused, semantic_raw, semantic_results)
+        ):
+            if not results:
+                continue
+            idx = np.fromiter((doc_index[r[0]] for r in results), dtype=np.intp, count=len(results))
+            scores = np.array([r[1] for r in results], dtype=np.float64)
+            raw[idx] = scores
+
+            if method == "rrf":
+                fused[idx] = 1 / (k + np.array([r[2] for r in results]) + 1)
+            elif method == "cc":
+                low, span = scores.min(), np.ptp(scores)
+                fused[idx] = (scores - low) / span if span > 0 else 1.0
+            else:
+                mean, std = scores.mean(), scores.std()
+                fused[idx] = np.clip((scores - mean + 3 * std) / (6 * std), 0, 1) if std > 0 else 0.5
 
         # Combined score
-        for doc_id in scores:
-            scores[doc_id]['combined'] = (
-                alpha * scores[doc_id]['semantic'] +
-                (1 - alpha) * scores[doc_id]['bm25']
-            )
+        combined = alpha * semantic_fused + (1 - alpha) * bm25_fused
 
-        # Trier et formater
-        sorted_results = sorted(
-            scores.items(),
-            key=lambda x: x[1]['combined'],
-            reverse=True
-        )
+        # Trier (stable: a score egal, l'ordre d'apparition) et formater
+        order = np.argsort(-combined, kind='stable')
+        if top_k is not None:
+            order = order[:top_k]
+        payload = self._fetch_payload([doc_ids[i] for i in order])
 
         final_results = []
-        for doc_id, score_data in sorted_results:
-            text, metadata = None, None
-
-            if payload and doc_id in payload:
-                text, metadata = payload[doc_id]
-
-            if text is None:
-                idx = self._id_to_idx.get(doc_id)
-                if idx is not None:
-                    text = self.docs[idx]
-                    metadata = self.metadatas[idx]
+        for i in order:
+            doc_id = doc_ids[i]
+            text, metadata = payload.get(doc_id, (None, None))
 
             if text is None:
                 continue
@@ -395,9 +931,9 @@ class ObsidianRetriever:
                 'id': doc_id,
                 'text': text,
                 'metadata': metadata or {},
-                'score': score_data['combined'],
-                'bm25_score': score_data.get('bm25_raw', 0),
-                'semantic_score': score_data.get('semantic_raw', 0),
+                'score': float(combined[i]),
+                'bm25_score': float(bm25_raw[i]),
+                'semantic_score': float(semantic_raw[i]),
             })
 
         return final_results
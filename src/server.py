@@ -5,11 +5,17 @@ Serveur MCP pour vault Obsidian.
 
 import os
 import sys
+import asyncio
+import functools
 import logging
+import threading
+from collections import OrderedDict
+from itertools import islice
 from pathlib import Path
 from typing import Optional
 from datetime import datetime
 
+import orjson
 import yaml
 import chromadb
 from chromadb.config import Settings
@@ -30,13 +36,50 @@ mcp = FastMCP("obsidian-mcp")
 
 # Global clients (lazy initialized)
 _voyage_client = None
+_query_embedder = None
 _cohere_client = None
+_local_reranker = None
 _chroma_client = None
 _collection = None
 _retriever = None
 _graph = None
 _config = None
 
+# Ecritures ChromaDB (upsert, indexation, vidage) une a la fois: les outils
+# s'executent dans des threads concurrents
+_write_lock = threading.RLock()
+
+# Metadonnees des notes deja parsees par l'outil list (chemin -> titre, tags,
+# liens, mtime/taille), revalidees a chaque scan
+_scan_cache: dict = {}
+
+# Notes completes lues par l'outil read, cle (chemin, mtime_ns, taille): une
+# note modifiee change de cle. Les plus anciennes sont evincees au-dela de
+# READ_CACHE_SIZE entrees.
+READ_CACHE_SIZE = 512
+_read_cache: OrderedDict = OrderedDict()
+_read_cache_lock = threading.Lock()
+
+
+def _read_note(path: str, mtime_ns: int, size: int) -> Optional[dict]:
+    """Parse une note pour read, via le cache LRU si elle n'a pas change."""
+    from .note_parser import parse_note
+
+    key = (path, mtime_ns, size)
+    with _read_cache_lock:
+        note = _read_cache.get(key)
+        if note is not None:
+            _read_cache.move_to_end(key)
+            return note
+
+    note = parse_note(path, mtime_ns, size)
+    if note:
+        with _read_cache_lock:
+            _read_cache[key] = note
+            if len(_read_cache) > READ_CACHE_SIZE:
+                _read_cache.popitem(last=False)
+    return note
+
 
 def get_config() -> dict:
     """Charge la configuration."""
@@ -47,7 +90,7 @@ def get_config() -> dict:
     config_path = Path(__file__).parent.parent / "config" / "settings.yaml"
     if config_path.exists():
         with open(config_path, 'r', encoding='utf-8') as f:
-            _config = yaml.safe_load(f)
+            _config = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
     else:
         _config = {
             'vault': {'path': os.getenv('OBSIDIAN_VAULT', '')},
@@ -91,6 +134,35 @@ def get_cohere_client():
     return _cohere_client
 
 
+def get_local_reranker():
+    """
+    Lazy init du reranker local (reranking.provider: local).
+
+    Retourne None s'il n'est pas configure ou n'a pas pu etre charge:
+    le reranking passe alors par Cohere.
+    """
+    global _local_reranker
+    if _local_reranker is None:
+        rerank_config = get_config().get('reranking', {})
+        if rerank_config.get('provider') != 'local':
+            return None
+
+        try:
+            from .reranker import LocalReranker
+
+            _local_reranker = LocalReranker(
+                model_dir=str(Path(__file__).parent.parent / rerank_config['model_path']),
+                model_file=rerank_config.get('model_file', 'model.onnx'),
+                max_length=rerank_config.get('max_length', 512)
+            )
+        except Exception as e:
+            logger.warning(f"Reranker local indisponible, repli sur Cohere: {e}")
+            # Ne pas retenter a chaque requete
+            _local_reranker = False
+
+    return _local_reranker or None
+
+
 def get_collection():
     """Lazy init ChromaDB collection."""
     global _chroma_client, _collection
@@ -111,19 +183,28 @@ def get_collection():
 
 def get_retriever():
     """Lazy init retriever."""
-    global _retriever
+    global _retriever, _query_embedder
     if _retriever is None:
-        from .retriever import ObsidianRetriever
+        from .retriever import ObsidianRetriever, QueryEmbeddingBatcher
 
+        config = get_config()
+        db_path = Path(__file__).parent.parent / config['database']['path']
         collection = get_collection()
-        voyage = get_voyage_client()
 
-        def embed_fn(texts):
-            # Utilise voyage-3 pour les requetes (meme modele que l'indexation)
-            result = voyage.embed(texts=texts, model="voyage-3", input_type="query")
-            return result.embeddings
+        if _query_embedder is None:
+            voyage = get_voyage_client()
+
+            def embed_fn(texts):
+                # Utilise voyage-3 pour les requetes (meme modele que l'indexation)
+                result = voyage.embed(texts=texts, model="voyage-3", input_type="query")
+                return result.embeddings
 
-        _retriever = ObsidianRetriever(collection, embedding_function=embed_fn)
+            # Les recherches concurrentes partagent un seul appel Voyage
+            _query_embedder = QueryEmbeddingBatcher(embed_fn)
+
+        _retriever = ObsidianRetriever(
+            collection, embedding_function=_query_embedder, db_path=str(db_path)
+        )
     return _retriever
 
 
@@ -144,7 +225,25 @@ def get_graph():
 
 
 def rerank_results(query: str, results: list[dict], top_n: int = 10) -> list[dict]:
-    """Rerank avec Cohere si disponible."""
+    """Rerank avec le modele local si configure, sinon Cohere si disponible."""
+    local_reranker = get_local_reranker()
+    if local_reranker is not None and results:
+        try:
+            ranked = local_reranker.rerank(
+                query, [r['text'][:4000] for r in results], top_n=top_n
+            )
+
+            reranked = []
+            for index, score in ranked:
+                result = results[index].copy()
+                result['rerank_score'] = score
+                reranked.append(result)
+
+            return reranked
+
+        except Exception as e:
+            logger.warning(f"Reranking local echoue, repli sur Cohere: {e}")
+
     cohere_client = get_cohere_client()
     if not cohere_client or not results:
         return results[:top_n]
@@ -175,6 +274,45 @@ def rerank_results(query: str, results: list[dict], top_n: int = 10) -> list[dic
         return results[:top_n]
 
 
+def _has_strong_signal(results: list[dict]) -> bool:
+    """
+    Le premier resultat domine-t-il nettement? Similarite semantique elevee
+    et ecart net avec tous les suivants (l'ordre fusionne n'est pas celui
+    des scores semantiques): le reranking ne changerait pas la tete.
+
+    Sans score semantique pour la tete (resultat BM25 seul), pas de signal.
+    """
+    if not results:
+        return False
+
+    top = results[0].get('semantic_score')
+    if not top:
+        return False
+
+    rerank_config = get_config().get('reranking', {})
+    min_score = rerank_config.get('strong_signal_score', 0.75)
+    min_gap = rerank_config.get('strong_signal_gap', 0.1)
+
+    runner_up = max((r.get('semantic_score') or 0.0 for r in results[1:]), default=0.0)
+    return top >= min_score and top - runner_up >= min_gap
+
+
+# Formats de sortie des outils de consultation
+OUTPUT_FORMATS = ("markdown", "json")
+
+
+def _format_error(format: str) -> Optional[str]:
+    """Message d'erreur si le format de sortie est inconnu."""
+    if format not in OUTPUT_FORMATS:
+        return f"Format inconnu: {format}. Choisir parmi: {', '.join(OUTPUT_FORMATS)}"
+    return None
+
+
+def _to_json(data) -> str:
+    """Sortie JSON compacte (format="json")."""
+    return orjson.dumps(data).decode('utf-8')
+
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
@@ -186,8 +324,8 @@ def _index_single_note(note_path: str) -> str:
     Plus rapide que l'indexation complete du vault.
     Utilise pour l'auto-indexation apres write.
     """
-    global _retriever, _collection, _chroma_client
     import gc
+    from .indexer import note_doc_id
     from .note_parser import parse_note
 
     config = get_config()
@@ -217,36 +355,77 @@ def _index_single_note(note_path: str) -> str:
         "path": note_path,
         "vault_path": vault_path_str,
         "tags": ",".join(note['tags']) if note['tags'] else "",
-        "wikilinks": ",".join(note['wikilinks'][:20]) if note['wikilinks'] else "",
+        "wikilinks_json": orjson.dumps(note['wikilinks']).decode(),
         "mtime": str(Path(note_path).stat().st_mtime)
     }
 
     # Upsert dans ChromaDB
-    collection = get_collection()
-    collection.upsert(
-        ids=[vault_path_str],
-        embeddings=[embedding],
-        documents=[text],
-        metadatas=[metadata]
-    )
+    doc_id = note_doc_id(note_path)
+    with _write_lock:
+        collection = get_collection()
+        collection.upsert(
+            ids=[doc_id],
+            embeddings=[embedding],
+            documents=[text],
+            metadatas=[metadata]
+        )
 
-    # Reset le retriever pour qu'il rebuild l'index BM25
-    _retriever = None
+        # Mettre a jour l'index BM25 en place (sans relire la collection)
+        if _retriever is not None:
+            _retriever.add_documents([doc_id], [text], [metadata])
     gc.collect()
 
     return "ok"
 
 
+def _unindex_note(note_path: str):
+    """Retire une note de ChromaDB et de l'index BM25."""
+    from .indexer import note_doc_id
+
+    doc_id = note_doc_id(note_path)
+    with _write_lock:
+        get_collection().delete(ids=[doc_id])
+        if _retriever is not None:
+            _retriever.remove_documents([doc_id])
+
+
+def _in_thread(fn):
+    """
+    Expose un outil synchrone en coroutine executee dans un thread.
+
+    Les appels bloquants (disque, ChromaDB, Voyage, Cohere) ne bloquent plus
+    la boucle d'evenements FastMCP: les requetes MCP concurrentes avancent
+    en parallele. La signature et la docstring restent celles de l'outil.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return wrapper
+
+
+def _serialized(fn):
+    """Execute l'outil sous _write_lock (ecritures ChromaDB exclusives)."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _write_lock:
+            return fn(*args, **kwargs)
+    return wrapper
+
+
 # ============================================================================
 # MCP TOOLS (11 outils)
 # ============================================================================
 
 @mcp.tool()
-def search(
+async def search(
     query: str,
     top_k: int = 10,
     folder: Optional[str] = None,
-    tags: Optional[str] = None
+    tags: Optional[str] = None,
+    rerank: bool = True,
+    rerank_candidates: Optional[int] = None,
+    fusion: Optional[str] = None,
+    format: str = "markdown"
 ) -> str:
     """
     Recherche semantique hybride dans le vault Obsidian.
@@ -256,47 +435,91 @@ def search(
         top_k: Nombre de resultats (defaut: 10)
         folder: Filtrer par dossier (optionnel)
         tags: Filtrer par tags, separes par virgules (optionnel)
+        rerank: Reordonner avec le reranker (defaut: True). False = ordre de
+            la fusion BM25 + semantique, beaucoup plus rapide
+        rerank_candidates: Nombre de candidats soumis au reranker
+            (defaut: 2 x top_k)
+        fusion: Fusion BM25 + semantique: "rrf" (rangs), "cc" (scores
+            normalises min-max) ou "dbsf" (scores normalises par leur
+            distribution). Defaut: search.fusion de la config, sinon "rrf"
+        format: "markdown" (defaut) ou "json" (liste d'objets title, path,
+            tags, score, excerpt: plus compact, a mettre en forme cote client)
 
     Returns:
         Notes pertinentes avec titre, extrait et score
     """
-    retriever = get_retriever()
+    from .retriever import FUSION_METHODS
+
+    format_error = _format_error(format)
+    if format_error:
+        return format_error
+
     config = get_config()
+    search_config = config.get('search', {})
+    fusion = fusion or search_config.get('fusion', 'rrf')
+    if fusion not in FUSION_METHODS:
+        return f"Fusion inconnue: {fusion}. Choisir parmi: {', '.join(FUSION_METHODS)}"
+
+    retriever = get_retriever()
 
     # Parser les tags
     tag_list = None
     if tags:
         tag_list = [t.strip() for t in tags.split(',')]
 
-    # Recherche hybride
-    alpha = 1.0 - config.get('search', {}).get('bm25_weight', 0.3)
-    results = retriever.search(
+    # Recherche hybride (BM25 + ChromaDB + Voyage hors de la boucle d'evenements,
+    # pour que les appels MCP concurrents ne s'attendent pas)
+    alpha = 1.0 - search_config.get('bm25_weight', 0.3)
+    candidates = max(rerank_candidates or top_k * 2, top_k) if rerank else top_k
+    results = await asyncio.to_thread(
+        retriever.search,
         query=query,
-        top_k=top_k * 2,  # Over-fetch for reranking
+        top_k=candidates,  # Over-fetch for reranking
         alpha=alpha,
         folder=folder,
-        tags=tag_list
+        tags=tag_list,
+        fusion=fusion,
+        rrf_k=search_config.get('rrf_k', 60)
     )
 
-    # Rerank
-    results = rerank_results(query, results, top_n=top_k)
+    # Rerank, sauf si le premier resultat s'impose deja
+    if rerank and not _has_strong_signal(results):
+        results = await asyncio.to_thread(rerank_results, query, results, top_n=top_k)
+    else:
+        results = results[:top_k]
 
-    # Formater la sortie
+    # Formater la sortie (un bloc par resultat)
     output = []
     for i, r in enumerate(results, 1):
         meta = r.get('metadata', {})
         title = meta.get('title', 'Sans titre')
         path = meta.get('vault_path', meta.get('path', ''))
         note_tags = meta.get('tags', '')
-        excerpt = r['text'][:300] + "..." if len(r['text']) > 300 else r['text']
         score = r.get('rerank_score', r.get('score', 0))
 
-        output.append(f"## {i}. {title}")
-        output.append(f"**Chemin**: {path}")
-        if note_tags:
-            output.append(f"**Tags**: {note_tags}")
-        output.append(f"**Score**: {score:.3f}")
-        output.append(f"\n{excerpt}\n")
+        if format == "json":
+            output.append({
+                'title': title,
+                'path': path,
+                'tags': [t for t in note_tags.split(',') if t],
+                'score': score,
+                'excerpt': r['text'][:300],
+            })
+            continue
+
+        tags_line = f"**Tags**: {note_tags}\n" if note_tags else ""
+        excerpt = r['text'][:300] + "..." if len(r['text']) > 300 else r['text']
+
+        output.append(
+            f"## {i}. {title}\n"
+            f"**Chemin**: {path}\n"
+            f"{tags_line}"
+            f"**Score**: {score:.3f}\n"
+            f"\n{excerpt}\n"
+        )
+
+    if format == "json":
+        return _to_json(output)
 
     if not output:
         return "Aucun resultat trouve."
@@ -305,6 +528,7 @@ def search(
 
 
 @mcp.tool()
+@_in_thread
 def read(path: str) -> str:
     """
     Lit une note avec ses metadonnees.
@@ -325,13 +549,15 @@ def read(path: str) -> str:
     if not note_path.suffix:
         note_path = note_path.with_suffix('.md')
 
-    if not note_path.exists():
-        return f"Note non trouvee: {path}"
-
     try:
-        from .note_parser import parse_note
+        # Un seul stat: sert de test d'existence et de cle du cache
+        try:
+            st = note_path.stat()
+        except FileNotFoundError:
+            return f"Note non trouvee: {path}"
+
+        note = _read_note(str(note_path), st.st_mtime_ns, st.st_size)
 
-        note = parse_note(str(note_path))
         if not note:
             return f"Impossible de parser: {path}"
 
@@ -360,6 +586,7 @@ def read(path: str) -> str:
 
 
 @mcp.tool()
+@_in_thread
 def write(
     path: str,
     content: str,
@@ -389,16 +616,18 @@ def write(
         note_path.parent.mkdir(parents=True, exist_ok=True)
 
         if mode == "create":
-            if note_path.exists():
+            # 'x': echoue si la note existe, sans fenetre entre test et creation
+            try:
+                with note_path.open('x', encoding='utf-8') as f:
+                    f.write(content)
+            except FileExistsError:
                 return f"La note existe deja: {path}. Utilisez mode='replace' pour remplacer."
-            note_path.write_text(content, encoding='utf-8')
             result = f"Note creee: {path}"
 
         elif mode == "append":
-            existing = ""
-            if note_path.exists():
-                existing = note_path.read_text(encoding='utf-8')
-            note_path.write_text(existing + "\n" + content, encoding='utf-8')
+            # Ajout en fin de fichier, sans relire ni reecrire la note
+            with note_path.open('a', encoding='utf-8') as f:
+                f.write("\n" + content)
             result = f"Contenu ajoute a: {path}"
 
         else:  # replace
@@ -421,6 +650,7 @@ def write(
 
 
 @mcp.tool()
+@_in_thread
 def delete(path: str) -> str:
     """
     Supprime une note.
@@ -437,17 +667,23 @@ def delete(path: str) -> str:
     if not note_path.suffix:
         note_path = note_path.with_suffix('.md')
 
-    if not note_path.exists():
-        return f"Note non trouvee: {path}"
-
     try:
         note_path.unlink()
-        return f"Note supprimee: {path}"
+    except FileNotFoundError:
+        return f"Note non trouvee: {path}"
     except Exception as e:
         return f"Erreur suppression: {e}"
 
+    try:
+        _unindex_note(str(note_path))
+    except Exception as e:
+        logger.warning(f"Desindexation echouee: {e}")
+
+    return f"Note supprimee: {path}"
+
 
 @mcp.tool()
+@_in_thread
 def move(old_path: str, new_path: str) -> str:
     """
     Deplace ou renomme une note.
@@ -469,22 +705,30 @@ def move(old_path: str, new_path: str) -> str:
     if not new_note.suffix:
         new_note = new_note.with_suffix('.md')
 
-    if not old_note.exists():
-        return f"Note non trouvee: {old_path}"
-
     try:
-        new_note.parent.mkdir(parents=True, exist_ok=True)
-        old_note.rename(new_note)
+        try:
+            old_note.rename(new_note)
+        except FileNotFoundError:
+            # Note source absente, ou dossier de destination a creer (pas
+            # de dossier vide laisse dans le vault si la note n'existe pas)
+            if new_note.parent.exists() or not old_note.exists():
+                raise
+            new_note.parent.mkdir(parents=True, exist_ok=True)
+            old_note.rename(new_note)
         return f"Note deplacee: {old_path} -> {new_path}"
+    except FileNotFoundError:
+        return f"Note non trouvee: {old_path}"
     except Exception as e:
         return f"Erreur deplacement: {e}"
 
 
 @mcp.tool()
+@_in_thread
 def list(
     folder: Optional[str] = None,
     tags: Optional[str] = None,
-    limit: int = 50
+    limit: int = 50,
+    format: str = "markdown"
 ) -> str:
     """
     Liste les notes du vault.
@@ -493,12 +737,17 @@ def list(
         folder: Filtrer par dossier. Utiliser "/" pour les notes a la racine seulement.
         tags: Filtrer par tags, separes par virgules (optionnel)
         limit: Nombre max de resultats (defaut: 50)
+        format: "markdown" (defaut) ou "json" (liste d'objets title, path, tags)
 
     Returns:
         Liste des notes avec titre et tags
     """
     from .note_parser import scan_vault
 
+    format_error = _format_error(format)
+    if format_error:
+        return format_error
+
     vault = get_vault_path()
 
     # Cas special: "/" = notes a la racine seulement (pas dans un sous-dossier)
@@ -512,25 +761,31 @@ def list(
     if not scan_path.exists():
         return f"Dossier non trouve: {folder}"
 
-    notes = scan_vault(str(scan_path))
-
-    # Filtrer pour racine seulement (pas de separateur dans vault_path)
-    if root_only:
-        notes = [
-            n for n in notes
-            if '\\' not in n.get('vault_path', '') and '/' not in n.get('vault_path', '')
-        ]
-
-    # Filtrer par tags
-    if tags:
-        tag_list = [t.strip().lower() for t in tags.split(',')]
-        notes = [
-            n for n in notes
-            if any(t.lower() in [x.lower() for x in n['tags']] for t in tag_list)
-        ]
+    # Filtre par tags applique pendant le scan: les notes ecartees ne sont
+    # pas copiees
+    tag_set = {t.strip().lower() for t in tags.split(',')} if tags else None
+
+    # Racine seulement: les sous-dossiers ne sont pas parcourus. On s'arrete
+    # des que limit notes sont trouvees; fermer le generateur annule le
+    # parsing des notes restantes. Threads seulement: pas de fork depuis le
+    # serveur multithread.
+    notes_iter = scan_vault(
+        str(scan_path), cache=_scan_cache,
+        note_filter=(
+            (lambda note: not tag_set.isdisjoint(x.lower() for x in note['tags']))
+            if tag_set else None
+        ),
+        recursive=not root_only, processes=False
+    )
+    # Pas de list(...): dans ce module, 'list' est l'outil MCP
+    notes = [*islice(notes_iter, max(limit, 0))]
+    notes_iter.close()
 
-    # Limiter
-    notes = notes[:limit]
+    if format == "json":
+        return _to_json([
+            {'title': n['title'], 'path': n.get('vault_path', n['path']), 'tags': n['tags']}
+            for n in notes
+        ])
 
     if not notes:
         return "Aucune note trouvee."
@@ -545,23 +800,32 @@ def list(
 
 
 @mcp.tool()
-def backlinks(path: str) -> str:
+@_in_thread
+def backlinks(path: str, format: str = "markdown") -> str:
     """
     Trouve les notes qui pointent vers cette note.
 
     Args:
         path: Chemin ou titre de la note
+        format: "markdown" (defaut) ou "json" (liste des chemins)
 
     Returns:
         Liste des notes avec backlinks
     """
+    format_error = _format_error(format)
+    if format_error:
+        return format_error
+
     graph = get_graph()
 
     # Normaliser le chemin
     if path.endswith('.md'):
         path = path[:-3]
 
-    links = graph.get_backlinks(path)
+    links = graph.get_backlinks(path, sort=True)
+
+    if format == "json":
+        return _to_json(links)
 
     if not links:
         return f"Aucun backlink trouve pour: {path}"
@@ -574,17 +838,22 @@ def backlinks(path: str) -> str:
 
 
 @mcp.tool()
-def similar(path: str, top_k: int = 5) -> str:
+async def similar(path: str, top_k: int = 5, format: str = "markdown") -> str:
     """
     Trouve les notes semantiquement similaires.
 
     Args:
         path: Chemin de la note source
         top_k: Nombre de resultats (defaut: 5)
+        format: "markdown" (defaut) ou "json" (liste d'objets title, path, score)
 
     Returns:
         Notes similaires avec score
     """
+    format_error = _format_error(format)
+    if format_error:
+        return format_error
+
     retriever = get_retriever()
 
     # Normaliser le chemin
@@ -593,7 +862,17 @@ def similar(path: str, top_k: int = 5) -> str:
     if not full_path.suffix:
         full_path = full_path.with_suffix('.md')
 
-    results = retriever.find_similar(str(full_path), top_k=top_k)
+    results = await asyncio.to_thread(retriever.find_similar, str(full_path), top_k=top_k)
+
+    if format == "json":
+        return _to_json([
+            {
+                'title': r.get('metadata', {}).get('title', 'Sans titre'),
+                'path': r.get('metadata', {}).get('vault_path', ''),
+                'score': r.get('score', 0),
+            }
+            for r in results
+        ])
 
     if not results:
         return f"Aucune note similaire trouvee pour: {path}"
@@ -612,6 +891,8 @@ def similar(path: str, top_k: int = 5) -> str:
 
 
 @mcp.tool()
+@_in_thread
+@_serialized
 def refresh() -> str:
     """
     Rafraichit l'index BM25 apres indexation de nouvelles notes.
@@ -634,6 +915,8 @@ def refresh() -> str:
 
 
 @mcp.tool()
+@_in_thread
+@_serialized
 def index(full: bool = False) -> str:
     """
     Indexe les nouvelles notes directement depuis le serveur MCP.
@@ -659,9 +942,11 @@ def index(full: bool = False) -> str:
 
         logger.info(f"Indexation {'complete' if full else 'incrementale'} du vault...")
 
+        # Pas de fork depuis le serveur, dont les outils tournent en threads
         indexer = ObsidianIndexer(
             vault_path=vault_path,
-            db_path=str(db_path)
+            db_path=str(db_path),
+            parse_processes=False
         )
         stats = indexer.index_vault(incremental=not full)
 
@@ -694,6 +979,8 @@ def index(full: bool = False) -> str:
 
 
 @mcp.tool()
+@_in_thread
+@_serialized
 def clear() -> str:
     """
     Vide completement la base ChromaDB et le graphe.
@@ -745,6 +1032,8 @@ def clear() -> str:
 
 
 @mcp.tool()
+@_in_thread
+@_serialized
 def reload() -> str:
     """
     Recharge completement tous les caches et connexions.
@@ -759,6 +1048,7 @@ def reload() -> str:
     import gc
     import sqlite3
     global _voyage_client, _cohere_client, _chroma_client, _collection, _retriever, _graph, _config
+    global _query_embedder, _local_reranker
 
     config = get_config()
     db_path = Path(__file__).parent.parent / config['database']['path']
@@ -788,7 +1078,11 @@ def reload() -> str:
     # Etape 4: Reset toutes les variables globales
     _config = None
     _voyage_client = None
+    if _query_embedder is not None:
+        _query_embedder.close()
+        _query_embedder = None
     _cohere_client = None
+    _local_reranker = None
     _chroma_client = None
     _collection = None
     _retriever = None
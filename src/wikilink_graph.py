@@ -1,9 +1,17 @@
 """Graphe de wikilinks pour gestion des backlinks."""
 
-import json
 from pathlib import Path
 from typing import Optional
-from collections import defaultdict
+
+import numpy as np
+import orjson
+
+# Part maximale de notes touchees pour une mise a jour note par note
+# (au-dela, update_notes reconstruit en bloc). Un ajout, une suppression ou un
+# changement de titre re-resout aussi les liens des notes qui portent ce nom:
+# il compte pour RENAME_COST notes de plus.
+INCREMENTAL_MAX_RATIO = 0.2
+RENAME_COST = 4
 
 
 class WikilinkGraph:
@@ -18,17 +26,40 @@ class WikilinkGraph:
 
     def __init__(self):
         # note_path -> set of notes it links to
-        self.outgoing: dict[str, set[str]] = defaultdict(set)
+        self.outgoing: dict[str, set[str]] = {}
 
         # note_path -> set of notes that link to it
-        self.incoming: dict[str, set[str]] = defaultdict(set)
+        self.incoming: dict[str, set[str]] = {}
 
         # Mapping titre/alias -> chemin reel
         self.title_to_path: dict[str, str] = {}
 
+        # Etat persiste: chemin -> (titre, [[liens]] bruts). Liens resolus,
+        # titres et index en sont deduits.
+        self._notes: dict[str, tuple[str, list[str]]] = {}
+
+        # Index inverses pour les mises a jour incrementales:
+        # nom (minuscules) -> notes designees par ce nom (titre ou chemin),
+        # nom (minuscules) -> notes dont un lien porte ce nom (construit quand
+        # un nom change de note: inutile pour les consultations)
+        self._claims: dict[str, set[str]] = {}
+        self._linkers: Optional[dict[str, set[str]]] = {}
+
+        # Tenus a jour a chaque ajout/retrait de lien ou de note:
+        # notes sans lien entrant, liens (source, cible) vers une note absente,
+        # nombre total de liens
+        self._orphans: set[str] = set()
+        self._broken: set[tuple[str, str]] = set()
+        self._link_count = 0
+
     def add_note(self, note_path: str, title: str, wikilinks: list[str]):
         """
-        Ajoute une note au graphe.
+        Ajoute (ou remplace) une note dans le graphe.
+
+        Seuls les liens et titres qui changent sont touches. Si le titre
+        change, les liens des autres notes qui portent l'ancien ou le nouveau
+        nom sont resolus a nouveau: le graphe reste celui d'une reconstruction
+        complete.
 
         Args:
             note_path: Chemin relatif de la note (sans .md)
@@ -38,78 +69,123 @@ class WikilinkGraph:
         # Normaliser le chemin
         note_key = self._normalize_path(note_path)
 
-        # Enregistrer le mapping titre -> chemin
-        self.title_to_path[title.lower()] = note_key
-        self.title_to_path[note_key.lower()] = note_key
-
-        # Reset les liens sortants pour cette note
-        old_links = self.outgoing.get(note_key, set())
-        for old_target in old_links:
-            self.incoming[old_target].discard(note_key)
-
-        self.outgoing[note_key] = set()
+        old_title, old_links = self._notes.get(note_key, (None, ()))
+        self._update_linkers(note_key, old_links, wikilinks)
+        self._notes[note_key] = (title, [*wikilinks])
+        self._add_node(note_key)
 
-        # Ajouter les nouveaux liens
-        for link in wikilinks:
-            target = self._resolve_link(link)
-            self.outgoing[note_key].add(target)
-            self.incoming[target].add(note_key)
+        old_names = self._note_names(note_key, old_title) if old_title is not None else set()
+        affected = self._update_claims(note_key, old_names, self._note_names(note_key, title))
+        affected.add(note_key)
+        for source in affected:
+            self._relink(source)
 
     def remove_note(self, note_path: str):
-        """Retire une note du graphe."""
+        """
+        Retire une note du graphe.
+
+        Les liens qui pointaient vers elle sont conserves comme liens casses,
+        comme dans une reconstruction sans cette note.
+        """
         note_key = self._normalize_path(note_path)
 
-        # Retirer des liens sortants
-        for target in self.outgoing.get(note_key, []):
-            self.incoming[target].discard(note_key)
+        if note_key not in self._notes:
+            return
+        title, wikilinks = self._notes[note_key]
+        self._update_linkers(note_key, wikilinks, ())
+        del self._notes[note_key]
 
-        # Retirer des liens entrants
-        for source in self.incoming.get(note_key, []):
-            self.outgoing[source].discard(note_key)
+        # Retirer des liens sortants
+        for target in [*self.outgoing.get(note_key, ())]:
+            self._remove_edge(note_key, target)
 
         # Supprimer la note
-        self.outgoing.pop(note_key, None)
-        self.incoming.pop(note_key, None)
+        self._remove_node(note_key)
+
+        for source in self._update_claims(note_key, self._note_names(note_key, title), set()):
+            self._relink(source)
+
+    def update_notes(self, notes: list[dict], removed_paths: list[str]):
+        """
+        Applique les notes modifiees et supprimees d'une indexation incrementale.
+
+        Au-dela de INCREMENTAL_MAX_RATIO des notes touchees (voir RENAME_COST),
+        reconstruit en bloc depuis l'etat persiste: plus rapide que les mises
+        a jour une a une. Le resultat est le meme dans les deux cas.
+
+        Args:
+            notes: Notes ajoutees ou modifiees (dicts comme pour add_from_note)
+            removed_paths: Chemins relatifs des notes supprimees
+        """
+        changes = {
+            self._normalize_path(note.get('vault_path', note.get('path', ''))): note
+            for note in notes
+        }
+        renamed = len(removed_paths) + sum(
+            1 for note_key, note in changes.items()
+            if self._notes.get(note_key, (None,))[0] != note.get('title', '')
+        )
+        cost = len(changes) + len(removed_paths) + RENAME_COST * renamed
+        if cost > len(self._notes) * INCREMENTAL_MAX_RATIO:
+            entries = dict(self._notes)
+            for path in removed_paths:
+                entries.pop(self._normalize_path(path), None)
+            for note_key, note in changes.items():
+                entries[note_key] = (note.get('title', ''), note.get('wikilinks', []))
+            self._rebuild(entries)
+            return
+
+        for path in removed_paths:
+            self.remove_note(path)
+        for note in notes:
+            self.add_from_note(note)
+
+    def add_from_note(self, note: dict):
+        """
+        Ajoute une note parsee au graphe.
+
+        Args:
+            note: dict avec 'vault_path' (ou 'path'), 'title', 'wikilinks'
+        """
+        vault_path = note.get('vault_path', note.get('path', ''))
+        title = note.get('title', '')
+        wikilinks = note.get('wikilinks', [])
 
-    def get_backlinks(self, note_path: str) -> list[str]:
+        self.add_note(vault_path, title, wikilinks)
+
+    def get_backlinks(self, note_path: str, sort: bool = False) -> list[str]:
         """
         Retourne les notes qui pointent vers cette note.
 
         Args:
             note_path: Chemin ou titre de la note
+            sort: Trier par ordre alphabetique (affichage)
 
         Returns:
             Liste des chemins des notes qui pointent vers celle-ci
         """
         note_key = self._resolve_link(note_path)
-        return sorted(list(self.incoming.get(note_key, set())))
+        sources = self.incoming.get(note_key, ())
+        return sorted(sources) if sort else [*sources]
 
-    def get_outgoing_links(self, note_path: str) -> list[str]:
+    def get_outgoing_links(self, note_path: str, sort: bool = False) -> list[str]:
         """
         Retourne les notes vers lesquelles pointe cette note.
 
         Args:
             note_path: Chemin de la note
+            sort: Trier par ordre alphabetique (affichage)
 
         Returns:
             Liste des chemins des notes liees
         """
         note_key = self._normalize_path(note_path)
-        return sorted(list(self.outgoing.get(note_key, set())))
+        targets = self.outgoing.get(note_key, ())
+        return sorted(targets) if sort else [*targets]
 
     def get_orphan_notes(self) -> list[str]:
         """Retourne les notes sans aucun lien entrant."""
-        all_notes = set(self.outgoing.keys())
-        linked_notes = set()
-        for targets in self.outgoing.values():
-            linked_notes.update(targets)
-
-        orphans = []
-        for note in all_notes:
-            if not self.incoming.get(note):
-                orphans.append(note)
-
-        return sorted(orphans)
+        return sorted(self._orphans)
 
     def get_broken_links(self) -> list[tuple[str, str]]:
         """
@@ -118,15 +194,198 @@ class WikilinkGraph:
         Returns:
             Liste de tuples (source_note, broken_link)
         """
-        all_notes = set(self.outgoing.keys())
-        broken = []
+        return sorted(self._broken)
 
-        for source, targets in self.outgoing.items():
-            for target in targets:
-                if target not in all_notes:
-                    broken.append((source, target))
+    @staticmethod
+    def _note_names(note_key: str, title: str) -> set[str]:
+        """Noms (minuscules) par lesquels une note peut etre liee."""
+        names = {note_key.lower()}
+        if title:
+            names.add(title.lower())
+        return names
 
-        return broken
+    def _pick(self, name: str) -> Optional[str]:
+        """
+        Note designee par un nom, independamment de l'ordre d'ajout.
+
+        Un chemin l'emporte sur un titre; a egalite, le plus petit chemin.
+        """
+        keys = self._claims.get(name)
+        if not keys:
+            return None
+        if len(keys) == 1:
+            return next(iter(keys))
+        by_path = [key for key in keys if key.lower() == name]
+        return min(by_path or keys)
+
+    def _update_claims(self, note_key: str, old_names: set[str], new_names: set[str]) -> set[str]:
+        """
+        Met a jour les noms d'une note et title_to_path.
+
+        Returns:
+            Notes dont un lien porte un nom qui designe desormais une autre note
+        """
+        for name in old_names - new_names:
+            keys = self._claims[name]
+            keys.discard(note_key)
+            if not keys:
+                del self._claims[name]
+        for name in new_names - old_names:
+            self._claims.setdefault(name, set()).add(note_key)
+
+        affected = set()
+        for name in old_names ^ new_names:
+            winner = self._pick(name)
+            if winner == self.title_to_path.get(name):
+                continue
+            if winner is None:
+                del self.title_to_path[name]
+            else:
+                self.title_to_path[name] = winner
+            affected.update(self._linker_index().get(name, ()))
+        return affected
+
+    def _update_linkers(self, note_key: str, old_links, new_links):
+        """Met a jour l'index nom de lien -> notes sources (s'il est construit)."""
+        linkers = self._linkers
+        if linkers is None:
+            # Sera deduit de _notes a la premiere utilisation
+            return
+        old_names = {self._normalize_path(link).lower() for link in old_links}
+        new_names = {self._normalize_path(link).lower() for link in new_links}
+        for name in old_names - new_names:
+            sources = linkers[name]
+            sources.discard(note_key)
+            if not sources:
+                del linkers[name]
+        for name in new_names - old_names:
+            linkers.setdefault(name, set()).add(note_key)
+
+    def _linker_index(self) -> dict[str, set[str]]:
+        """Index nom de lien -> notes sources, construit a la demande."""
+        if self._linkers is None:
+            linkers = {}
+            for note_key, (_, wikilinks) in self._notes.items():
+                for link in wikilinks:
+                    linkers.setdefault(self._normalize_path(link).lower(), set()).add(note_key)
+            self._linkers = linkers
+        return self._linkers
+
+    def _relink(self, source: str):
+        """Resout les liens bruts d'une note et n'applique que la difference."""
+        targets = {self._resolve_link(link) for link in self._notes[source][1]}
+        current = self.outgoing[source]
+        for target in [t for t in current if t not in targets]:
+            self._remove_edge(source, target)
+        for target in targets.difference(current):
+            self._add_edge(source, target)
+
+    def _add_node(self, note_key: str):
+        """Declare une note existante (sans toucher a ses liens)."""
+        if note_key in self.outgoing:
+            return
+        self.outgoing[note_key] = set()
+
+        sources = self.incoming.get(note_key)
+        if sources:
+            for source in sources:
+                self._broken.discard((source, note_key))
+        else:
+            self._orphans.add(note_key)
+
+    def _remove_node(self, note_key: str):
+        """Retire une note existante; ses liens sortants doivent etre retires."""
+        if self.outgoing.pop(note_key, None) is None:
+            return
+        self._orphans.discard(note_key)
+        for source in self.incoming.get(note_key, ()):
+            self._broken.add((source, note_key))
+
+    def _add_edge(self, source: str, target: str):
+        """Ajoute le lien source -> cible (source existante)."""
+        targets = self.outgoing[source]
+        if target in targets:
+            return
+        targets.add(target)
+        self._link_count += 1
+        self.incoming.setdefault(target, set()).add(source)
+        self._orphans.discard(target)
+        if target not in self.outgoing:
+            self._broken.add((source, target))
+
+    def _remove_edge(self, source: str, target: str):
+        """Retire le lien source -> cible."""
+        targets = self.outgoing.get(source)
+        if targets is not None and target in targets:
+            targets.discard(target)
+            self._link_count -= 1
+        sources = self.incoming.get(target)
+        if sources is not None:
+            sources.discard(source)
+            if not sources:
+                del self.incoming[target]
+        self._broken.discard((source, target))
+        if target in self.outgoing and not sources:
+            self._orphans.add(target)
+
+    def _recompute_derived(self):
+        """Recalcule orphelins, liens casses et nombre de liens (apres chargement)."""
+        self._link_count = sum(len(targets) for targets in self.outgoing.values())
+        self._orphans = {note for note in self.outgoing if not self.incoming.get(note)}
+        self._broken = {
+            (source, target)
+            for source, targets in self.outgoing.items()
+            for target in targets
+            if target not in self.outgoing
+        }
+
+    def pagerank(
+        self,
+        damping: float = 0.85,
+        iterations: int = 50,
+        tol: float = 1e-6
+    ) -> dict[str, float]:
+        """
+        Centralite des notes par leurs liens (PageRank).
+
+        Iterations de puissance vectorisees (numpy) sur les liens entre notes
+        existantes: les liens casses sont ignores, le score des notes sans
+        lien sortant est redistribue uniformement.
+
+        Returns:
+            dict chemin -> score (somme 1)
+        """
+        notes = [*self.outgoing]
+        n = len(notes)
+        if n == 0:
+            return {}
+
+        index = {note: i for i, note in enumerate(notes)}
+        sources, targets = [], []
+        for source, links in self.outgoing.items():
+            i = index[source]
+            for target in links:
+                j = index.get(target)
+                if j is not None:
+                    sources.append(i)
+                    targets.append(j)
+
+        src = np.array(sources, dtype=np.intp)
+        dst = np.array(targets, dtype=np.intp)
+        out_degree = np.bincount(src, minlength=n).astype(np.float64)
+        dangling = out_degree == 0
+
+        rank = np.full(n, 1.0 / n)
+        for _ in range(iterations):
+            share = np.divide(rank, out_degree, out=np.zeros(n), where=~dangling)
+            new_rank = np.bincount(dst, weights=share[src], minlength=n)
+            new_rank = (1 - damping) / n + damping * (new_rank + rank[dangling].sum() / n)
+            converged = np.abs(new_rank - rank).sum() < tol
+            rank = new_rank
+            if converged:
+                break
+
+        return dict(zip(notes, rank.tolist()))
 
     def _normalize_path(self, path: str) -> str:
         """Normalise un chemin de note."""
@@ -149,11 +408,8 @@ class WikilinkGraph:
         """
         normalized = self._normalize_path(link)
 
-        # Essayer de trouver par titre
-        if normalized.lower() in self.title_to_path:
-            return self.title_to_path[normalized.lower()]
-
-        return normalized
+        # Essayer de trouver par titre (un seul lower() et un seul acces)
+        return self.title_to_path.get(normalized.lower(), normalized)
 
     def rebuild_from_notes(self, notes: list[dict]):
         """
@@ -162,52 +418,126 @@ class WikilinkGraph:
         Args:
             notes: Liste de dicts avec 'vault_path', 'title', 'wikilinks'
         """
-        self.outgoing.clear()
-        self.incoming.clear()
-        self.title_to_path.clear()
-
+        entries = {}
         for note in notes:
-            vault_path = note.get('vault_path', note.get('path', ''))
-            title = note.get('title', '')
-            wikilinks = note.get('wikilinks', [])
+            note_key = self._normalize_path(note.get('vault_path', note.get('path', '')))
+            entries[note_key] = (note.get('title', ''), note.get('wikilinks', []))
+        self._rebuild(entries)
+
+    def _rebuild(
+        self,
+        entries: dict[str, tuple[str, list[str]]],
+        saved_links: Optional[dict[str, list[str]]] = None
+    ):
+        """
+        Construction en bloc depuis chemin -> (titre, liens bruts).
+
+        Tous les noms sont enregistres avant de resoudre les liens, puis les
+        liens sont groupes par source et par cible sans passer par add_note.
+
+        Args:
+            entries: chemin -> (titre, liens bruts)
+            saved_links: Liens sortants deja resolus d'un fichier sauvegarde,
+                pour ne pas resoudre chaque lien au chargement
+        """
+        self._notes = entries
+
+        claims = {}
+        for note_key, (title, _) in entries.items():
+            for name in self._note_names(note_key, title):
+                claims.setdefault(name, set()).add(note_key)
+        self._claims = claims
+        self.title_to_path = {name: self._pick(name) for name in claims}
+
+        # dicts simples; cles de outgoing reservees en une fois
+        if saved_links is not None:
+            outgoing = {note_key: set(targets) for note_key, targets in saved_links.items()}
+        else:
+            outgoing = dict.fromkeys(entries)
+            # Un meme texte de lien revient dans beaucoup de notes: resolu une fois
+            resolved = {}
+            for note_key, (_, wikilinks) in entries.items():
+                targets = set()
+                for link in wikilinks:
+                    target = resolved.get(link)
+                    if target is None:
+                        target = resolved[link] = self._resolve_link(link)
+                    targets.add(target)
+                outgoing[note_key] = targets
+
+        # Sources groupees en listes par cible, converties en ensembles a la fin
+        grouped = {}
+        for note_key, targets in outgoing.items():
+            for target in targets:
+                sources = grouped.get(target)
+                if sources is None:
+                    grouped[target] = [note_key]
+                else:
+                    sources.append(note_key)
+        incoming = {target: set(sources) for target, sources in grouped.items()}
+
+        self._linkers = None
+        self.outgoing = outgoing
+        self.incoming = incoming
+        self._recompute_derived()
+
+    def save(self, path: str, pretty: bool = False):
+        """
+        Sauvegarde le graphe en JSON.
 
-            self.add_note(vault_path, title, wikilinks)
+        Ecrit les titres et liens bruts de chaque note (etat de reference) et
+        les liens sortants resolus; le reste est recalcule au chargement.
 
-    def save(self, path: str):
-        """Sauvegarde le graphe en JSON."""
+        Args:
+            path: Fichier de destination
+            pretty: JSON indente (lisible, pour le debogage)
+        """
         data = {
-            'outgoing': {k: list(v) for k, v in self.outgoing.items()},
-            'incoming': {k: list(v) for k, v in self.incoming.items()},
-            'title_to_path': self.title_to_path
+            'notes': self._notes,
+            'outgoing': self.outgoing
         }
 
-        Path(path).write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding='utf-8')
+        # Les ensembles de liens sont convertis en listes par orjson (default)
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        Path(path).write_bytes(orjson.dumps(data, default=list, option=option))
 
     def load(self, path: str) -> bool:
-        """Charge le graphe depuis un fichier JSON."""
+        """
+        Charge le graphe depuis un fichier JSON.
+
+        Returns:
+            True si le graphe peut etre mis a jour de facon incrementale.
+            Un fichier de l'ancien format (liens resolus seulement) est lu
+            pour les consultations mais renvoie False: il faut reconstruire.
+        """
         try:
-            data = json.loads(Path(path).read_text(encoding='utf-8'))
+            data = orjson.loads(Path(path).read_bytes())
 
-            self.outgoing = defaultdict(set)
-            for k, v in data.get('outgoing', {}).items():
-                self.outgoing[k] = set(v)
+            notes = data.get('notes')
+            if notes is not None:
+                self._rebuild(
+                    {note_key: (title, wikilinks) for note_key, (title, wikilinks) in notes.items()},
+                    data['outgoing']
+                )
+                return True
 
-            self.incoming = defaultdict(set)
-            for k, v in data.get('incoming', {}).items():
-                self.incoming[k] = set(v)
+            self.outgoing = {k: set(v) for k, v in data.get('outgoing', {}).items()}
+            self.incoming = {k: set(v) for k, v in data.get('incoming', {}).items()}
 
             self.title_to_path = data.get('title_to_path', {})
+            self._notes, self._claims, self._linkers = {}, {}, {}
+            self._recompute_derived()
 
-            return True
+            return False
         except Exception:
             return False
 
     def stats(self) -> dict:
         """Retourne des statistiques sur le graphe."""
         total_notes = len(self.outgoing)
-        total_links = sum(len(v) for v in self.outgoing.values())
-        orphans = len(self.get_orphan_notes())
-        broken = len(self.get_broken_links())
+        total_links = self._link_count
+        orphans = len(self._orphans)
+        broken = len(self._broken)
 
         return {
             'total_notes': total_notes,
@@ -227,6 +557,6 @@ if __name__ == "__main__":
     graph.add_note("note1", "Note 1", ["note2", "note3"])
     graph.add_note("note2", "Note 2", ["index"])
 
-    print("Backlinks vers note2:", graph.get_backlinks("note2"))
-    print("Liens sortants de index:", graph.get_outgoing_links("index"))
+    print("Backlinks vers note2:", graph.get_backlinks("note2", sort=True))
+    print("Liens sortants de index:", graph.get_outgoing_links("index", sort=True))
     print("Stats:", graph.stats())
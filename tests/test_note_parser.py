@@ -0,0 +1,117 @@
+"""Tests du parsing des notes: parse_note (une passe) contre les extract_*."""
+
+import os
+import random
+import tempfile
+import unittest
+
+from src.note_parser import (
+    MMAP_MIN_SIZE,
+    _scan_body,
+    extract_frontmatter,
+    extract_tags,
+    extract_title,
+    extract_wikilinks,
+    parse_note,
+)
+
+# Morceaux de corps de note combines par le fuzz: en-tetes, tags colles,
+# liens avec '#', fins de ligne, crochets et dieses isoles
+FRAGMENTS = [
+    "# ", "#", "## ", "### ", "\n", "\r\n", " ", "\t", "text", "word",
+    "#tag", "#a/#b", "#T-1", "#_x", "#9", "a#b", "##", "#[[x]]",
+    "[[", "]]", "[[Link]]", "[[#x]]", "[[Note#Sec|alias]]", "[[a|b]]",
+    "[[ -f file ]]", "[[img.png]]", "[[multi\n# H1]]", "|", "-", "/",
+]
+
+
+class ParseNoteTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def parse(self, content: str, name: str = "note.md", newline: str = "\n") -> dict:
+        path = os.path.join(self.dir, name)
+        with open(path, "w", encoding="utf-8", newline=newline) as f:
+            f.write(content)
+        return parse_note(path)
+
+    def assert_matches_helpers(self, content: str):
+        """parse_note donne les memes titre, tags et liens que les extract_*."""
+        note = self.parse(content)
+        # Contenu tel que lu (fins de ligne normalisees)
+        frontmatter, body = extract_frontmatter(note['raw_content'])
+        self.assertEqual(note['title'], extract_title(body, frontmatter, "note.md"), repr(content))
+        self.assertEqual(note['tags'], extract_tags(body, frontmatter), repr(content))
+        self.assertEqual(note['wikilinks'], extract_wikilinks(body), repr(content))
+
+    def test_heading_with_tags_and_links(self):
+        note = self.parse("# Title #tag and [[Link]]\nbody #other")
+        self.assertEqual(note['title'], "Title #tag and [[Link]]")
+        self.assertEqual(note['tags'], ["other", "tag"])
+        self.assertEqual(note['wikilinks'], ["Link"])
+
+    def test_link_to_heading(self):
+        note = self.parse("see [[#x]] and [[Note#Sec|alias]]")
+        self.assertEqual(note['tags'], ["x"])
+        self.assertEqual(note['wikilinks'], ["#x", "Note#Sec"])
+
+    def test_adjacent_tags(self):
+        self.assertEqual(self.parse("#a/#b")['tags'], ["a/", "b"])
+
+    def test_double_hash_is_not_tag_or_h1(self):
+        note = self.parse("## Sub #h2tag\ntext#notatag ##double #ok")
+        self.assertEqual(note['title'], "note")
+        self.assertEqual(note['tags'], ["h2tag", "ok"])
+
+    def test_first_h1_after_tag_line(self):
+        self.assertEqual(self.parse("#tag\n# H\n# Second")['title'], "H")
+
+    def test_frontmatter_title_and_tags(self):
+        note = self.parse("---\ntitle: FM\ntags: [x, y]\n---\n# H1 #z\n")
+        self.assertEqual(note['title'], "FM")
+        self.assertEqual(note['tags'], ["x", "y", "z"])
+
+    def test_crlf_same_as_lf(self):
+        content = "---\ntitle: T\ntags: [x]\n---\n# H #t\n[[Link]] #u\n"
+        lf = self.parse(content, "lf.md")
+        for name, text in (("small.md", content), ("large.md", content + "pad\n" * MMAP_MIN_SIZE)):
+            with self.subTest(name=name):
+                crlf = self.parse(text, name, newline="\r\n")
+                self.assertNotIn("\r", crlf['content'])
+                self.assertEqual(crlf['title'], lf['title'])
+                self.assertEqual(crlf['tags'], lf['tags'])
+                self.assertEqual(crlf['wikilinks'], lf['wikilinks'])
+                self.assertEqual(crlf['frontmatter'], lf['frontmatter'])
+        self.assertEqual(self.parse(content, "crlf.md", newline="\r\n")['hash'], lf['hash'])
+
+    def test_examples_match_helpers(self):
+        for content in [
+            "# Title #tag and [[Link]]\nbody",
+            "see [[#x]] and [[Note#Sec|alias]]",
+            "#a/#b",
+            "## Sub #h2tag\n#not a h1",
+            "#\n# \n#  Real H1",
+            "[[multi\n# H1 inside]]",
+            "# \n#tag",
+            "x\n#\ty",
+        ]:
+            self.assert_matches_helpers(content)
+
+    def test_fuzz_matches_helpers(self):
+        rng = random.Random(7)
+        for _ in range(500):
+            body = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 25)))
+            self.assert_matches_helpers(body)
+
+    def test_scan_body_raw_links(self):
+        # Cibles brutes: le nettoyage (_clean_wikilinks) vient apres
+        h1, tags, links = _scan_body("# H [[ -f x ]]\n[[a.md]]")
+        self.assertEqual(h1, "H [[ -f x ]]")
+        self.assertEqual(tags, [])
+        self.assertEqual(links, [" -f x ", "a.md"])
+
+
+if __name__ == "__main__":
+    unittest.main()
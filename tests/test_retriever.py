@@ -0,0 +1,227 @@
+"""Tests de QueryEmbeddingBatcher et de l'index BM25 de ObsidianRetriever."""
+
+import threading
+import time
+import uuid
+import unittest
+
+import chromadb
+import numpy as np
+from chromadb.config import Settings
+
+from src.retriever import ObsidianRetriever, QueryEmbeddingBatcher
+
+
+def _embed(texts: list[str]) -> list[list[float]]:
+    """Embeddings jouets: sac de mots hache sur 32 dimensions, normalise."""
+    out = []
+    for text in texts:
+        vec = np.zeros(32)
+        for word in text.lower().split():
+            vec[hash(word) % 32] += 1
+        out.append((vec / (np.linalg.norm(vec) or 1)).tolist())
+    return out
+
+
+class QueryEmbeddingBatcherTest(unittest.TestCase):
+    def run_threads(self, target, count: int) -> list:
+        """Lance count appels de target(i) en parallele; resultats ou exceptions."""
+        results = [None] * count
+
+        def call(i):
+            try:
+                results[i] = target(i)
+            except BaseException as e:
+                results[i] = e
+
+        # Daemons: un appel bloque fait echouer le test sans bloquer la sortie
+        threads = [threading.Thread(target=call, args=(i,), daemon=True) for i in range(count)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=10)
+            self.assertFalse(t.is_alive(), "appel bloque")
+        return results
+
+    def test_coalesces_concurrent_calls(self):
+        batches = []
+        release = threading.Event()
+
+        def embed_batch(texts):
+            batches.append(len(texts))
+            release.wait(5)
+            return [[len(text)] for text in texts]
+
+        batcher = QueryEmbeddingBatcher(embed_batch, max_batch=64, max_wait=0.2)
+        self.addCleanup(batcher.close)
+        threading.Timer(0.5, release.set).start()
+        results = self.run_threads(lambda i: batcher(["x" * i]), 10)
+
+        self.assertEqual(results, [[[i]] for i in range(10)])
+        self.assertEqual(sum(batches), 10)
+        self.assertLess(len(batches), 10)
+
+    def test_error_reaches_every_caller_of_batch(self):
+        def embed_batch(texts):
+            time.sleep(0.05)
+            raise ValueError("api down")
+
+        batcher = QueryEmbeddingBatcher(embed_batch, max_batch=64, max_wait=0.2)
+        self.addCleanup(batcher.close)
+        results = self.run_threads(lambda i: batcher([f"q{i}"]), 5)
+        for result in results:
+            self.assertIsInstance(result, ValueError)
+
+    def test_call_after_close_raises(self):
+        batcher = QueryEmbeddingBatcher(lambda texts: [[0.0] for _ in texts])
+        self.assertEqual(batcher(["a"]), [[0.0]])
+        batcher.close()
+        batcher.close()
+        result, = self.run_threads(lambda i: batcher(["a"]), 1)
+        self.assertIsInstance(result, RuntimeError)
+
+    def test_close_fails_nothing_already_queued(self):
+        started = threading.Event()
+
+        def embed_batch(texts):
+            started.set()
+            time.sleep(0.1)
+            return [[1.0] for _ in texts]
+
+        batcher = QueryEmbeddingBatcher(embed_batch, max_batch=1, max_wait=0)
+        results = []
+        callers = [
+            threading.Thread(target=lambda: results.append(batcher(["q"])), daemon=True)
+            for _ in range(3)
+        ]
+        for t in callers:
+            t.start()
+        started.wait(5)
+        batcher.close()
+        for t in callers:
+            t.join(timeout=10)
+            self.assertFalse(t.is_alive(), "appel bloque")
+        self.assertEqual(results, [[[1.0]]] * 3)
+
+    def test_pending_calls_fail_when_worker_dies(self):
+        entered = threading.Event()
+        release = threading.Event()
+
+        def embed_batch(texts):
+            entered.set()
+            release.wait(5)
+            # Erreur fatale: arrete le thread de fond
+            raise SystemExit
+
+        batcher = QueryEmbeddingBatcher(embed_batch, max_batch=1, max_wait=0)
+        results = [None, None]
+
+        def call(i):
+            try:
+                results[i] = batcher([f"q{i}"])
+            except BaseException as e:
+                results[i] = e
+
+        head = threading.Thread(target=call, args=(0,), daemon=True)
+        head.start()
+        entered.wait(5)
+        # Depose pendant que le thread de fond est occupe: reste en file
+        queued = threading.Thread(target=call, args=(1,), daemon=True)
+        queued.start()
+        time.sleep(0.05)
+        release.set()
+        for t in (head, queued):
+            t.join(timeout=10)
+            self.assertFalse(t.is_alive(), "appel bloque")
+
+        self.assertIsInstance(results[0], SystemExit)
+        self.assertIsInstance(results[1], RuntimeError)
+        late, = self.run_threads(lambda i: batcher(["late"]), 1)
+        self.assertIsInstance(late, RuntimeError)
+
+
+class RetrieverWriteTest(unittest.TestCase):
+    def setUp(self):
+        client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False))
+        self.collection = client.create_collection(
+            f"test_{uuid.uuid4().hex}", metadata={"hnsw:space": "cosine"}, embedding_function=None
+        )
+        self.addCleanup(client.delete_collection, self.collection.name)
+        self._upsert("a", "apples and pears in the orchard", "a.md")
+        self._upsert("b", "bananas grow in warm climates", "b.md")
+        self._upsert("c", "cherries ripen early in summer", "c.md")
+        self.retriever = ObsidianRetriever(self.collection, embedding_function=_embed)
+        self.retriever.ensure_bm25_index(background=False)
+
+    def _upsert(self, doc_id: str, text: str, path: str):
+        """Ecrit dans ChromaDB puis dans l'index BM25, comme le serveur."""
+        metadata = {"path": path, "title": path}
+        self.collection.upsert(
+            ids=[doc_id], embeddings=_embed([text]), documents=[text], metadatas=[metadata]
+        )
+        if hasattr(self, 'retriever'):
+            self.retriever.add_documents([doc_id], [text], [metadata])
+
+    def _delete(self, doc_id: str):
+        self.collection.delete(ids=[doc_id])
+        self.retriever.remove_documents([doc_id])
+
+    def _texts(self, query: str, alpha: float) -> dict:
+        results = self.retriever.search(query, top_k=10, alpha=alpha)
+        return {r['id']: r['text'] for r in results}
+
+    def test_write_then_search_returns_new_text(self):
+        self._upsert("b", "bananas and kiwis from the market", "b.md")
+        for alpha in (1.0, 0.5, 0.0):
+            with self.subTest(alpha=alpha):
+                texts = self._texts("kiwis market", alpha)
+                self.assertEqual(texts.get("b"), "bananas and kiwis from the market")
+
+    def test_new_note_found_by_bm25(self):
+        self._upsert("d", "dragonfruit smoothie recipe", "d.md")
+        # Reindexage en attente applique avant de rendre la main
+        self.retriever.ensure_bm25_index(background=False)
+        self.assertIn("d", self._texts("dragonfruit", 0.0))
+        self.assertIn("d", self.retriever.ids)
+
+    def test_delete_then_search_drops_note(self):
+        self._delete("a")
+        for alpha in (1.0, 0.5, 0.0):
+            with self.subTest(alpha=alpha):
+                self.assertNotIn("a", self._texts("apples orchard", alpha))
+
+    def test_matches_fresh_index(self):
+        self._upsert("b", "bananas and apples together", "b.md")
+        self._delete("c")
+        self._upsert("d", "apples again with cherries", "d.md")
+        self.retriever.ensure_bm25_index(background=False)
+        fresh = ObsidianRetriever(self.collection, embedding_function=_embed)
+        query = "apples cherries"
+        got = [(r['id'], r['score']) for r in self.retriever.search(query, alpha=0.0)]
+        want = [(r['id'], r['score']) for r in fresh.search(query, alpha=0.0)]
+        self.assertEqual(len(got), len(want))
+        for (got_id, got_score), (want_id, want_score) in zip(got, want):
+            self.assertEqual(got_id, want_id)
+            self.assertAlmostEqual(got_score, want_score)
+
+    def test_search_does_not_wait_for_reindex(self):
+        self._upsert("b", "bananas and kiwis from the market", "b.md")
+        results = {}
+
+        def search():
+            results.update(self._texts("kiwis market", 0.5))
+
+        # Reindexage bloque: la recherche sert le corpus courant
+        with self.retriever._index_lock:
+            thread = threading.Thread(target=search)
+            thread.start()
+            thread.join(timeout=10)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(results.get("b"), "bananas and kiwis from the market")
+
+        self.retriever.ensure_bm25_index(background=False)
+        self.assertNotIn("b", self.retriever._pending)
+
+
+if __name__ == "__main__":
+    unittest.main()
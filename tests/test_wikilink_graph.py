@@ -0,0 +1,231 @@
+"""Tests du graphe de wikilinks: mises a jour incrementales contre reconstruction."""
+
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import orjson
+
+from src import wikilink_graph
+from src.wikilink_graph import WikilinkGraph
+
+# Noms volontairement en collision: chemins, titres et liens se recouvrent
+# (casse, extension, separateurs, titre egal au chemin d'une autre note)
+NAMES = ["a", "b", "sub/c", "D", "d", "e/F"]
+TITLES = ["Gamma", "gamma", "A", "sub/c", "D", "Other", "", "Beta"]
+LINKS = NAMES + TITLES + ["Missing", "sub/C.md", "e\\F"]
+
+
+def graph_state(graph: WikilinkGraph) -> tuple:
+    """Etat observable du graphe (ensembles: independant de l'ordre)."""
+    return (
+        {k: set(v) for k, v in graph.outgoing.items()},
+        {k: set(v) for k, v in graph.incoming.items()},
+        set(graph.get_orphan_notes()),
+        set(graph.get_broken_links()),
+        graph.stats()['total_links'],
+        dict(graph.title_to_path),
+    )
+
+
+def rebuilt(notes: dict) -> WikilinkGraph:
+    graph = WikilinkGraph()
+    graph.rebuild_from_notes([*notes.values()])
+    return graph
+
+
+def note(path: str, title: str, links: list[str]) -> dict:
+    return {'vault_path': path + ".md", 'title': title, 'wikilinks': links}
+
+
+class GraphFuzzTest(unittest.TestCase):
+    """Sequences aleatoires de modifications, comparees a une reconstruction."""
+
+    def random_note(self, rng: random.Random) -> dict:
+        return note(
+            rng.choice(NAMES),
+            rng.choice(TITLES),
+            [rng.choice(LINKS) for _ in range(rng.randint(0, 4))]
+        )
+
+    def run_fuzz(self, seed: int, trials: int = 300):
+        rng = random.Random(seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            graph_path = os.path.join(tmp, "graph.json")
+            for trial in range(trials):
+                current = {}
+                for _ in range(rng.randint(0, 5)):
+                    n = self.random_note(rng)
+                    current[n['vault_path']] = n
+                graph = rebuilt(current)
+
+                for step in range(15):
+                    if rng.random() < 0.15:
+                        graph.save(graph_path)
+                        graph = WikilinkGraph()
+                        self.assertTrue(graph.load(graph_path))
+
+                    changed = {}
+                    for _ in range(rng.randint(0, 3)):
+                        n = self.random_note(rng)
+                        changed[n['vault_path']] = n
+                    removed = [
+                        p + ".md" for p in rng.sample(NAMES, rng.randint(0, 2))
+                        if p + ".md" not in changed
+                    ]
+
+                    if rng.random() < 0.5:
+                        for path in removed:
+                            graph.remove_note(path if rng.random() < 0.5 else path[:-3])
+                        for n in changed.values():
+                            graph.add_from_note(n)
+                    else:
+                        graph.update_notes([*changed.values()], removed)
+                    for path in removed:
+                        current.pop(path, None)
+                    current.update(changed)
+
+                    self.assertEqual(
+                        graph_state(graph), graph_state(rebuilt(current)),
+                        f"seed={seed} trial={trial} step={step}"
+                    )
+
+    def test_incremental_matches_rebuild(self):
+        self.run_fuzz(seed=11)
+
+    def test_matches_rebuild_when_always_rebuilding(self):
+        with mock.patch.object(wikilink_graph, 'INCREMENTAL_MAX_RATIO', 0):
+            self.run_fuzz(seed=12, trials=100)
+
+    def test_matches_rebuild_when_never_rebuilding(self):
+        with mock.patch.object(wikilink_graph, 'INCREMENTAL_MAX_RATIO', float('inf')):
+            self.run_fuzz(seed=13, trials=100)
+
+
+class UpdateThresholdTest(unittest.TestCase):
+    """update_notes de part et d'autre de INCREMENTAL_MAX_RATIO."""
+
+    size = 50
+
+    def setUp(self):
+        self.notes = {
+            f"n{i}.md": note(f"n{i}", f"Title {i}", [f"n{(i + 1) % self.size}", f"Title {(i + 7) % self.size}"])
+            for i in range(self.size)
+        }
+        self.limit = int(self.size * wikilink_graph.INCREMENTAL_MAX_RATIO)
+
+    def apply(self, changed: list[dict], removed: list[str]) -> bool:
+        """Applique la mise a jour; True si elle a reconstruit en bloc."""
+        graph = rebuilt(self.notes)
+        with mock.patch.object(WikilinkGraph, '_rebuild', autospec=True,
+                               side_effect=WikilinkGraph._rebuild) as rebuild:
+            graph.update_notes(changed, removed)
+
+        expected = dict(self.notes)
+        for path in removed:
+            expected.pop(path, None)
+        expected.update({n['vault_path']: n for n in changed})
+        self.assertEqual(graph_state(graph), graph_state(rebuilt(expected)))
+        return rebuild.called
+
+    def relinked(self, count: int) -> list[dict]:
+        """count notes dont seuls les liens changent."""
+        return [note(f"n{i}", f"Title {i}", ["n0", "Missing"]) for i in range(count)]
+
+    def retitled(self, count: int) -> list[dict]:
+        """count notes renommees (liens d'autres notes a re-resoudre)."""
+        return [note(f"n{i}", f"Renamed {i}", []) for i in range(count)]
+
+    def test_link_changes_at_limit_are_incremental(self):
+        self.assertFalse(self.apply(self.relinked(self.limit), []))
+
+    def test_link_changes_above_limit_rebuild(self):
+        self.assertTrue(self.apply(self.relinked(self.limit + 1), []))
+
+    def test_renames_count_extra(self):
+        # cout d'un renommage: 1 + RENAME_COST
+        per_rename = 1 + wikilink_graph.RENAME_COST
+        below = self.limit // per_rename
+        self.assertFalse(self.apply(self.retitled(below), []))
+        self.assertTrue(self.apply(self.retitled(below + 1), []))
+
+    def test_removals_count_as_renames(self):
+        per_removal = 1 + wikilink_graph.RENAME_COST
+        below = self.limit // per_removal
+        paths = [f"n{i}.md" for i in range(self.size - below - 1, self.size)]
+        self.assertFalse(self.apply([], paths[1:]))
+        self.assertTrue(self.apply([], paths))
+
+
+class GraphSemanticsTest(unittest.TestCase):
+    """Regles de resolution, identiques en incremental et en reconstruction."""
+
+    def test_resolution_independent_of_order(self):
+        notes = [note("x", "Shared", []), note("y", "Shared", []), note("z", "", ["Shared"])]
+        forward, backward = WikilinkGraph(), WikilinkGraph()
+        forward.rebuild_from_notes(notes)
+        backward.rebuild_from_notes(notes[::-1])
+        self.assertEqual(graph_state(forward), graph_state(backward))
+        # A egalite, le plus petit chemin
+        self.assertEqual(forward.get_outgoing_links("z"), ["x"])
+
+    def test_path_beats_title(self):
+        graph = WikilinkGraph()
+        graph.rebuild_from_notes([note("b", "a", []), note("a", "", []), note("c", "", ["a"])])
+        self.assertEqual(graph.get_outgoing_links("c"), ["a"])
+
+    def test_deleted_target_becomes_broken_link(self):
+        graph = rebuilt({"a": note("a", "", ["b"]), "b": note("b", "", [])})
+        graph.remove_note("b.md")
+        # Le lien reste, vers le nom non resolu
+        self.assertEqual(graph.get_outgoing_links("a"), ["b"])
+        self.assertEqual(graph.get_broken_links(), [("a", "b")])
+        self.assertNotIn("b", graph.get_orphan_notes())
+        graph.add_from_note(note("b", "", []))
+        self.assertEqual(graph.get_backlinks("b"), ["a"])
+        self.assertEqual(graph.get_broken_links(), [])
+
+    def test_retitle_relinks_other_notes(self):
+        graph = rebuilt({"a": note("a", "Old", []), "c": note("c", "", ["Old", "New"])})
+        graph.update_notes([note("a", "New", [])], [])
+        self.assertEqual(graph.get_backlinks("New"), ["c"])
+        self.assertEqual(graph.get_broken_links(), [("c", "Old")])
+
+
+class GraphPersistenceTest(unittest.TestCase):
+    def test_save_load_roundtrip(self):
+        notes = {f"n{i}": note(f"d{i % 3}/n{i}", f"T{i % 4}", [f"T{(i + 1) % 4}", f"n{i + 2}"]) for i in range(20)}
+        graph = rebuilt(notes)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.json")
+            graph.save(path)
+            loaded = WikilinkGraph()
+            self.assertTrue(loaded.load(path))
+        self.assertEqual(graph_state(loaded), graph_state(graph))
+
+        # Le graphe recharge se met a jour comme l'original
+        change = [note("d0/n0", "T9", ["T1"])]
+        graph.update_notes(change, ["d1/n1.md"])
+        loaded.update_notes(change, ["d1/n1.md"])
+        self.assertEqual(graph_state(loaded), graph_state(graph))
+
+    def test_legacy_file_requires_rebuild(self):
+        legacy = {
+            'outgoing': {'a': ['b']},
+            'incoming': {'b': ['a']},
+            'title_to_path': {'a': 'a', 'b': 'b'},
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graph.json")
+            with open(path, "wb") as f:
+                f.write(orjson.dumps(legacy))
+            graph = WikilinkGraph()
+            self.assertFalse(graph.load(path))
+        # Lisible pour les consultations en attendant la reconstruction
+        self.assertEqual(graph.get_backlinks("b"), ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()